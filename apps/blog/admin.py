@@ -27,11 +27,16 @@ class CategoryAnalyticsAdmin(admin.ModelAdmin):
 
 
 class HeadingInline(admin.TabularInline):
+    # Headings are extracted from the post content on save
     model = Heading
-    extra = 1
+    extra = 0
     fields = ('title', 'level', 'order', 'slug')
-    prepopulated_fields = {'slug': ('title',)}
+    readonly_fields = fields
     ordering = ('order',)
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Post)
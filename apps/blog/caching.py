@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'blog:version:{0}'
+# When each namespace was last bumped, for Last-Modified headers
+VERSION_TIME_KEY = 'blog:version_time:{0}'
+
+# Read endpoints are invalidated through version bumps, so entries can live long
+CACHE_TIMEOUT = getattr(settings, 'BLOG_CACHE_TIMEOUT', 60 * 60 * 6)
+
+POST_LIST_NAMESPACE = 'post_list'
+CATEGORIES_NAMESPACE = 'categories'
+SUGGEST_NAMESPACE = 'suggest'
+
+
+def post_namespace(slug):
+    return f'post:{slug}'
+
+
+def category_namespace(slug):
+    return f'category:{slug}'
+
+
+def get_version(namespace):
+    return get_versions(namespace)[0]
+
+
+def get_versions(*namespaces):
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        cache.add(key, 1, timeout=None)
+    if missing:
+        found.update(cache.get_many(missing))
+
+    return [found.get(key, 1) for key in keys]
+
+
+def get_last_modified(*namespaces):
+    times = cache.get_many([VERSION_TIME_KEY.format(namespace) for namespace in namespaces])
+    return max(times.values(), default=None)
+
+
+def bump_version(namespace):
+    key = VERSION_KEY.format(namespace)
+    cache.set(VERSION_TIME_KEY.format(namespace), int(time.time()), timeout=None)
+    cache.add(key, 1, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key was evicted between add() and incr()
+        cache.set(key, 2, timeout=None)
+        return 2
+
+
+def bump_versions(*namespaces):
+    for namespace in set(namespaces):
+        bump_version(namespace)
+
+
+def bump_versions_on_commit(*namespaces):
+    # Bumped before the commit, a concurrent reader could rebuild an entry
+    # from the old rows and store it under the new version until it expires
+    transaction.on_commit(lambda: bump_versions(*namespaces))
+
+
+def versioned_key(prefix, namespaces, *parts):
+    """
+    Builds a cache key that embeds the current version of every namespace the
+    cached value depends on; bumping any of them orphans the old entry.
+    """
+    versions = '.'.join(str(version) for version in get_versions(*namespaces))
+    return ':'.join([prefix, versions, *(str(part) for part in parts)])
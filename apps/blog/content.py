@@ -0,0 +1,127 @@
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+# Derivatives of the CKEditor content computed on save, so reads never have
+# to load or parse the raw `content` column.
+CONTENT_DERIVED_FIELDS = ('content_html', 'excerpt', 'word_count', 'reading_time')
+WORDS_PER_MINUTE = getattr(settings, 'BLOG_WORDS_PER_MINUTE', 200)
+EXCERPT_LENGTH = 300
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'code', 'del', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span', 'strong',
+    'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    '*': {'id', 'class', 'title'},
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan', 'scope'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_URL_SCHEMES = {'', 'http', 'https', 'mailto'}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Dropped together with everything inside them
+DROPPED_TAGS = {'script', 'style', 'template', 'iframe', 'object', 'noscript'}
+# Tags that separate words in the plain text
+BLOCK_TAGS = {
+    'blockquote', 'br', 'caption', 'div', 'figcaption', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'p',
+    'pre', 'td', 'th', 'tr',
+}
+URL_IGNORED_CHARACTERS_RE = re.compile(r'[\x00-\x20]')
+
+
+def allowed_url(value):
+    # Browsers ignore control characters and spaces when reading the scheme
+    return urlparse(URL_IGNORED_CHARACTERS_RE.sub('', value)).scheme.lower() in ALLOWED_URL_SCHEMES
+
+
+class ContentParser(HTMLParser):
+    """
+    Re-serializes HTML keeping only allow-listed tags and attributes, with
+    all text escaped, and collects the plain text along the way.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropped_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS or self.dropped_depth:
+            self.dropped_depth += tag in DROPPED_TAGS
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        attributes = ''.join(
+            f' {name}="{escape(value)}"'
+            for name, value in attrs
+            if name in allowed and value is not None and (name not in URL_ATTRIBUTES or allowed_url(value))
+        )
+        self.html.append(f'<{tag}{attributes}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropped_depth:
+            self.dropped_depth -= tag in DROPPED_TAGS
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside it, as a browser would
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropped_depth:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        self.html.extend(f'</{tag}>' for tag in reversed(self.open_tags))
+        self.open_tags = []
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    return text[:length - 1].rsplit(' ', 1)[0].rstrip(' ,;:.') + '…'
+
+
+def render_content(content):
+    """
+    Returns the CONTENT_DERIVED_FIELDS of `content`: its sanitized HTML, a
+    plain text excerpt, the word count and the reading time in minutes.
+    """
+    parser = ContentParser()
+    parser.feed(content or '')
+    parser.close()
+
+    text = ' '.join(''.join(parser.text).split())
+    word_count = len(text.split())
+    return {
+        'content_html': ''.join(parser.html),
+        'excerpt': make_excerpt(text),
+        'word_count': word_count,
+        'reading_time': math.ceil(word_count / WORDS_PER_MINUTE),
+    }
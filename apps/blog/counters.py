@@ -0,0 +1,245 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+# The one client (and connection pool) every blog module talks to Redis through;
+# other modules look it up as `counters.redis_client` so it can be swapped once
+redis_client = redis.StrictRedis(host=settings.REDIS_HOST, port=6379, db=0)
+
+# Impressions and clicks are counted into one Redis hash per metric, kind and
+# time bucket (field = object id), which the periodic flush folds into the
+# database.
+COUNTER_METRICS = ('impressions', 'clicks')
+# Raw views only feed the hourly history; lifetime views count unique viewers
+VIEWS_METRIC = 'views'
+ROLLUP_METRICS = (VIEWS_METRIC, *COUNTER_METRICS)
+COUNTER_BUCKET_SECONDS = 60
+COUNTER_BUCKET_TTL = 60 * 60 * 24 * 7
+COUNTER_KEY = '{metric}:{kind}:{bucket}'
+
+
+def current_bucket(now=None):
+    return int(now if now is not None else time.time()) // COUNTER_BUCKET_SECONDS
+
+
+def counter_key(metric, kind, bucket):
+    return COUNTER_KEY.format(metric=metric, kind=kind, bucket=bucket)
+
+
+def counter_pipeline():
+    # Commands queued on it run as one MULTI/EXEC unit
+    return redis_client.pipeline(transaction=True)
+
+
+def record_impressions(kind, object_ids, pipe=None):
+    """
+    Counts one impression for every id in `object_ids` with a single
+    pipelined round trip, whatever the number of ids.
+    """
+    add_counts('impressions', kind, {object_id: 1 for object_id in object_ids}, pipe=pipe)
+
+
+def add_counts(metric, kind, counts, pipe=None, bucket=None):
+    """
+    Adds `counts` ({object id: n}) to the current (or given) bucket of
+    `metric`. When a pipeline is given the commands are only queued on it.
+    """
+    if not counts:
+        return
+
+    execute = pipe is None
+    if execute:
+        pipe = redis_client.pipeline(transaction=False)
+
+    key = counter_key(metric, kind, current_bucket() if bucket is None else bucket)
+    for object_id, count in counts.items():
+        pipe.hincrby(key, str(object_id), count)
+    pipe.expire(key, COUNTER_BUCKET_TTL)
+
+    if execute:
+        pipe.execute()
+
+
+# Impressions used to be counted into one string key per object. The flush
+# folds any that are left into the current bucket, until a scan finds none.
+LEGACY_IMPRESSIONS_KEY = '{kind}:impressions:{object_id}'
+LEGACY_DRAINED_KEY = 'counters:legacy_drained:{kind}'
+
+
+def drain_legacy_impressions(kind):
+    """
+    Moves the per-object impression keys of the old counters into the
+    current impressions bucket and returns how many objects had counts.
+    """
+    drained_key = LEGACY_DRAINED_KEY.format(kind=kind)
+    if redis_client.exists(drained_key):
+        return 0
+
+    keys = list(redis_client.scan_iter(match=LEGACY_IMPRESSIONS_KEY.format(kind=kind, object_id='*'), count=1000))
+    if not keys:
+        redis_client.set(drained_key, 1)
+        return 0
+
+    # GETDEL reads and deletes each key atomically, so an increment from a
+    # worker still on the old code lands in this read or in a new key
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.getdel(key)
+    values = pipe.execute()
+
+    counts = {
+        key.decode('utf-8').rsplit(':', 1)[1]: int(value)
+        for key, value in zip(keys, values) if value and int(value) > 0
+    }
+    add_counts('impressions', kind, counts)
+    return len(counts)
+
+
+def counter_bucket_keys(metric, kind):
+    return list(redis_client.scan_iter(match=counter_key(metric, kind, '*'), count=1000))
+
+
+def bucket_start(bucket, seconds=60 * 60):
+    # Start of the `seconds`-long period a counter bucket falls in
+    return datetime.fromtimestamp(bucket * COUNTER_BUCKET_SECONDS // seconds * seconds, tz=dt_timezone.utc)
+
+
+def drain_hash(key):
+    """
+    Reads and deletes a counter hash in one MULTI/EXEC transaction, so an
+    increment either lands in the drained snapshot or in a new hash.
+    """
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hgetall(key)
+    pipe.delete(key)
+    counts, _ = pipe.execute()
+    return {field.decode('utf-8'): int(value) for field, value in counts.items()}
+
+
+# Dwell time is buffered as a running sum (milliseconds) and sample count per
+# object. Both live in the same bucket hash so one drain always sees matching
+# pairs, and the average is folded into the analytics rows by the flush.
+DWELL_METRIC = 'dwell'
+
+
+def add_dwell_times(kind, durations, pipe=None):
+    """
+    Buffers `durations` ({object id: [seconds, ...]}) as sum and count.
+    """
+    add_dwell_totals(kind, {
+        object_id: (int(round(sum(seconds) * 1000)), len(seconds)) for object_id, seconds in durations.items()
+    }, pipe=pipe)
+
+
+def add_dwell_totals(kind, totals, pipe=None):
+    if not totals:
+        return
+
+    execute = pipe is None
+    if execute:
+        pipe = redis_client.pipeline(transaction=False)
+
+    key = counter_key(DWELL_METRIC, kind, current_bucket())
+    for object_id, (milliseconds, samples) in totals.items():
+        pipe.hincrby(key, f'{object_id}:ms', milliseconds)
+        pipe.hincrby(key, f'{object_id}:n', samples)
+    pipe.expire(key, COUNTER_BUCKET_TTL)
+
+    if execute:
+        pipe.execute()
+
+
+def drain_dwell_times(kind):
+    """
+    Drains every dwell bucket of `kind` into {object id: (milliseconds, samples)}.
+    """
+    totals = {}
+    for key in counter_bucket_keys(DWELL_METRIC, kind):
+        for field, value in drain_hash(key).items():
+            object_id, _, part = field.rpartition(':')
+            milliseconds, samples = totals.get(object_id, (0, 0))
+            totals[object_id] = (milliseconds + value, samples) if part == 'ms' else (milliseconds, samples + value)
+    return {object_id: total for object_id, total in totals.items() if total[1] > 0}
+
+
+# Unique viewers are estimated with one lifetime HyperLogLog per object plus
+# one per day; objects with new viewers are queued in a "dirty" set so the
+# periodic materialization only touches those rows.
+UNIQUE_VIEWERS_KEY = 'uniques:{kind}:{object_id}'
+UNIQUE_VIEWERS_WINDOW_KEY = 'uniques:{kind}:{object_id}:{window}'
+UNIQUE_VIEWERS_WINDOW_DAYS = 35
+UNIQUE_VIEWERS_WINDOW_TTL = 60 * 60 * 24 * UNIQUE_VIEWERS_WINDOW_DAYS
+UNIQUE_VIEWERS_DIRTY_KEY = 'uniques:dirty:{kind}'
+
+
+def unique_viewers_window(moment=None):
+    return (moment or timezone.now()).strftime('%Y%m%d')
+
+
+def add_unique_viewer(kind, object_id, ip_address, pipe=None):
+    execute = pipe is None
+    if execute:
+        pipe = redis_client.pipeline(transaction=False)
+
+    window_key = UNIQUE_VIEWERS_WINDOW_KEY.format(kind=kind, object_id=object_id, window=unique_viewers_window())
+    pipe.pfadd(UNIQUE_VIEWERS_KEY.format(kind=kind, object_id=object_id), ip_address)
+    pipe.pfadd(window_key, ip_address)
+    pipe.expire(window_key, UNIQUE_VIEWERS_WINDOW_TTL)
+    pipe.sadd(UNIQUE_VIEWERS_DIRTY_KEY.format(kind=kind), str(object_id))
+
+    if execute:
+        pipe.execute()
+
+
+def add_lifetime_unique_viewers(kind, viewers):
+    """
+    Bulk variant for backfills: `viewers` maps object ids to IP addresses and
+    only the lifetime HyperLogLogs are fed.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for object_id, ip_addresses in viewers.items():
+        pipe.pfadd(UNIQUE_VIEWERS_KEY.format(kind=kind, object_id=object_id), *ip_addresses)
+    pipe.execute()
+    mark_unique_viewers_dirty(kind, list(viewers))
+
+
+def mark_unique_viewers_dirty(kind, object_ids, pipe=None):
+    if object_ids:
+        (pipe or redis_client).sadd(
+            UNIQUE_VIEWERS_DIRTY_KEY.format(kind=kind), *[str(object_id) for object_id in object_ids]
+        )
+
+
+def pop_unique_viewers_dirty(kind, count):
+    return [object_id.decode('utf-8') for object_id in redis_client.spop(UNIQUE_VIEWERS_DIRTY_KEY.format(kind=kind), count) or []]
+
+
+def count_unique_viewers(kind, object_ids):
+    pipe = redis_client.pipeline(transaction=False)
+    for object_id in object_ids:
+        pipe.pfcount(UNIQUE_VIEWERS_KEY.format(kind=kind, object_id=object_id))
+    return dict(zip(object_ids, pipe.execute()))
+
+
+def count_unique_viewers_between(kind, object_id, start, end):
+    """
+    Estimates the distinct viewers of one object over the UTC days the range
+    [start, end) touches, as the union of their daily HyperLogLogs. Returns
+    None when part of the range is older than the daily keys are kept.
+    """
+    first_day = start.astimezone(dt_timezone.utc).date()
+    last_day = (end - timedelta(microseconds=1)).astimezone(dt_timezone.utc).date()
+    if first_day <= timezone.now().astimezone(dt_timezone.utc).date() - timedelta(days=UNIQUE_VIEWERS_WINDOW_DAYS):
+        return None
+
+    # PFCOUNT over several keys returns the cardinality of their union
+    keys = [
+        UNIQUE_VIEWERS_WINDOW_KEY.format(
+            kind=kind, object_id=object_id, window=unique_viewers_window(first_day + timedelta(days=day)),
+        )
+        for day in range((last_day - first_day).days + 1)
+    ]
+    return redis_client.pfcount(*keys)
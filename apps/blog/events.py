@@ -0,0 +1,113 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Q
+
+from .models import Post, Category, exact_unique_views
+from .counters import (
+    VIEWS_METRIC,
+    counter_pipeline,
+    add_counts,
+    add_dwell_times,
+    add_unique_viewer,
+    mark_unique_viewers_dirty,
+)
+from .tasks import ANALYTICS_MODELS
+from .trending import TRENDING_WEIGHTS, bump_trending
+
+EVENT_TYPES = ('impression', 'click', 'view', 'dwell')
+EVENT_TARGETS = ('post', 'category')
+EVENT_METRICS = {'impression': 'impressions', 'click': 'clicks'}
+MAX_EVENTS_PER_BATCH = 500
+
+
+def target_queryset(kind):
+    return Post.postobjects.all() if kind == 'post' else Category.objects.all()
+
+
+def resolve_targets(events):
+    """
+    Maps every id or slug referenced by `events` to an object id with one
+    query per target type, so a batch costs the same whatever its size. Also
+    returns the category of every resolved post.
+    """
+    references = defaultdict(lambda: (set(), set()))
+    for event in events:
+        ids, slugs = references[event['target']]
+        if event.get('id'):
+            ids.add(event['id'])
+        else:
+            slugs.add(event['slug'])
+
+    resolved = {}
+    post_categories = {}
+    for kind, (ids, slugs) in references.items():
+        fields = ('id', 'slug', 'category_id') if kind == 'post' else ('id', 'slug')
+        rows = target_queryset(kind).filter(Q(id__in=ids) | Q(slug__in=slugs)).values_list(*fields)
+
+        for object_id, slug, *category_id in rows:
+            resolved[(kind, object_id)] = str(object_id)
+            resolved.setdefault((kind, slug), str(object_id))
+            if category_id:
+                post_categories[str(object_id)] = str(category_id[0])
+    return resolved, post_categories
+
+
+def record_events(events, ip_address):
+    """
+    Records a batch of validated events in a single Redis transaction and
+    returns the indexes of the events whose target does not exist.
+    """
+    resolved, post_categories = resolve_targets(events)
+
+    counts = defaultdict(Counter)
+    durations = defaultdict(lambda: defaultdict(list))
+    viewed = defaultdict(Counter)
+    trending = []
+    unresolved = []
+
+    for index, event in enumerate(events):
+        kind = event['target']
+        object_id = resolved.get((kind, event.get('id') or event.get('slug')))
+        if object_id is None:
+            unresolved.append(index)
+            continue
+
+        if kind == 'post' and event['type'] in TRENDING_WEIGHTS:
+            trending.append((object_id, post_categories[object_id], event['type']))
+
+        if event['type'] in EVENT_METRICS:
+            counts[(EVENT_METRICS[event['type']], kind)][object_id] += 1
+        elif event['type'] == 'view':
+            viewed[kind][object_id] += 1
+        else:
+            durations[kind][object_id].append(event['duration'])
+
+    exact = exact_unique_views()
+    if exact:
+        for kind, object_ids in viewed.items():
+            analytics_model = ANALYTICS_MODELS[kind]
+            analytics_model.view_model.objects.bulk_create(
+                [
+                    analytics_model.view_model(**{f'{analytics_model.target_field}_id': object_id, 'ip_address': ip_address})
+                    for object_id in object_ids
+                ],
+                ignore_conflicts=True,
+            )
+
+    pipe = counter_pipeline()
+    for (metric, kind), metric_counts in counts.items():
+        add_counts(metric, kind, metric_counts, pipe=pipe)
+    for kind, kind_durations in durations.items():
+        add_dwell_times(kind, kind_durations, pipe=pipe)
+    for kind, view_counts in viewed.items():
+        if exact:
+            mark_unique_viewers_dirty(kind, list(view_counts), pipe=pipe)
+        else:
+            for object_id in view_counts:
+                add_unique_viewer(kind, object_id, ip_address, pipe=pipe)
+        add_counts(VIEWS_METRIC, kind, view_counts, pipe=pipe)
+    pipe.execute()
+
+    bump_trending(trending)
+
+    return unresolved
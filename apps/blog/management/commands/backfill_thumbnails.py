@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.blog.tasks import THUMBNAIL_MODELS, refresh_thumbnail_variants
+
+
+def refresh(job):
+    kind, object_id, force = job
+    try:
+        return refresh_thumbnail_variants(kind, object_id, force=force), None
+    except Exception as e:
+        return False, f'{kind} {object_id}: {e}'
+
+
+class Command(BaseCommand):
+    help = 'Generates the resized thumbnail variants of existing posts and categories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that are already current.')
+
+    def handle(self, *args, **options):
+        jobs = [
+            (kind, str(object_id), options['force'])
+            for kind, model in THUMBNAIL_MODELS.items()
+            for object_id in model.objects.exclude(thumbnail='').exclude(thumbnail=None).values_list('id', flat=True)
+        ]
+
+        # Forked workers inherit the configured Django process but must open
+        # their own database connections
+        connections.close_all()
+
+        generated = 0
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as executor:
+            for written, error in executor.map(refresh, jobs, chunksize=8):
+                generated += written
+                if error:
+                    self.stderr.write(f'Failed {error}')
+
+        self.stdout.write(f'Generated variants for {generated} of {len(jobs)} thumbnails.')
@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from apps.blog.counters import add_lifetime_unique_viewers
+from apps.blog.models import PostView, CategoryView
+
+
+class Command(BaseCommand):
+    help = 'Seeds the unique viewer HyperLogLogs from the PostView and CategoryView tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        for kind, model, fk_name in (('post', PostView, 'post_id'), ('category', CategoryView, 'category_id')):
+            rows = model.objects.values_list(fk_name, 'ip_address').iterator(chunk_size=options['batch_size'])
+
+            total = 0
+            viewers = defaultdict(list)
+            for object_id, ip_address in rows:
+                viewers[str(object_id)].append(ip_address)
+                total += 1
+                if total % options['batch_size'] == 0:
+                    add_lifetime_unique_viewers(kind, viewers)
+                    viewers = defaultdict(list)
+
+            if viewers:
+                add_lifetime_unique_viewers(kind, viewers)
+
+            self.stdout.write(f'Backfilled {total} {kind} views.')
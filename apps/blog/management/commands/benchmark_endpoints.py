@@ -0,0 +1,284 @@
+import io
+import itertools
+import json
+import math
+import platform
+import re
+import statistics
+import time
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+import redis
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.blog import counters
+from apps.blog.models import Category, Post
+from apps.blog.trending import bump_trending
+from apps.blog.views import POST_ORDERING_FIELDS, POST_SORTING_FIELDS
+
+PERCENTILES = (50, 95, 99)
+# Caching is switched off for cold runs, so every request takes the slow path
+COLD_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def percentile(values, percent):
+    # Nearest rank, so every reported value is an observed one
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+class RedisCommandCounter:
+    """
+    Counts the commands every Redis client in the process sends, pipelined
+    ones included, while active.
+    """
+
+    def __init__(self):
+        self.commands = 0
+
+    @contextmanager
+    def active(self):
+        execute_command = redis.Redis.execute_command
+        execute_pipeline = redis.client.Pipeline.execute
+
+        def counted_command(client, *args, **kwargs):
+            self.commands += 1
+            return execute_command(client, *args, **kwargs)
+
+        def counted_pipeline(pipe, *args, **kwargs):
+            self.commands += len(pipe.command_stack)
+            return execute_pipeline(pipe, *args, **kwargs)
+
+        with patch.object(redis.Redis, 'execute_command', counted_command), \
+                patch.object(redis.client.Pipeline, 'execute', counted_pipeline):
+            yield self
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives every blog API route against a synthetic corpus (rolled back afterwards) and reports latency '
+        'percentiles, query and Redis command counts and response sizes, optionally saved as a JSON baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2_000)
+        parser.add_argument('--categories', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=None, help='seed_blog worker processes.')
+        parser.add_argument('--existing', action='store_true', help='Benchmark the data already in the database.')
+        parser.add_argument(
+            '--use-live-redis',
+            action='store_true',
+            help='Send counters and the cache to the configured Redis instead of an in-process fakeredis.',
+        )
+        parser.add_argument('--mode', choices=('cold', 'warm', 'both'), default='both')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Report changes against a JSON baseline written with --output.')
+        parser.add_argument('--threshold', type=float, default=0.2, help='p95 slowdown reported by --compare.')
+
+    def handle(self, *args, **options):
+        with ExitStack() as stack:
+            # The database is rolled back afterwards but Redis writes are not,
+            # so a live Redis is only touched when asked for explicitly
+            if not options['use_live_redis']:
+                self.use_fakeredis(stack)
+            stack.enter_context(override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']))
+
+            with transaction.atomic():
+                if not options['existing']:
+                    self.stdout.write(f"Seeding {options['posts']} posts...")
+                    call_command(
+                        'seed_blog',
+                        posts=options['posts'],
+                        categories=options['categories'],
+                        seed=options['seed'],
+                        **({'workers': options['workers']} if options['workers'] else {}),
+                        stdout=io.StringIO(),
+                    )
+                results = self.run_scenarios(self.build_scenarios(), options)
+                transaction.set_rollback(True)
+
+        report = {
+            'corpus': {'posts': Post.objects.count() if options['existing'] else options['posts']},
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        self.print_results(results)
+
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+                output.write('\n')
+            self.stdout.write(f"Saved {len(results)} results to {options['output']}.")
+
+    def use_fakeredis(self, stack):
+        try:
+            import fakeredis
+        except ImportError:
+            raise CommandError(
+                'The benchmark runs against fakeredis, which is not installed; '
+                'pass --use-live-redis to write to the configured Redis instead.'
+            )
+
+        # Clients on the same host and port share one in-memory server
+        client = fakeredis.FakeStrictRedis(host=settings.REDIS_HOST, port=6379, db=0)
+        stack.enter_context(patch.object(counters, 'redis_client', client))
+
+        cache_settings = settings.CACHES['default']
+        options = cache_settings.get('OPTIONS', {})
+        stack.enter_context(override_settings(CACHES={'default': {
+            **cache_settings,
+            'OPTIONS': {**options, 'CONNECTION_POOL_KWARGS': {'connection_class': fakeredis.FakeConnection}},
+        }}))
+
+    def build_scenarios(self):
+        """
+        Returns (name, method, url name, payload) for every route, with the
+        post list in each sorting, ordering, search and category combination.
+        """
+        posts = Post.postobjects.order_by('-popularity', '-id')
+        top_post = posts.values('slug', 'id', 'title').first()
+        if top_post is None:
+            raise CommandError('There are no published posts to benchmark.')
+        tail_post = posts.values('slug').reverse().first()
+        category = (
+            Category.objects.annotate(posts=Count('post')).order_by('-posts').values('slug', 'parent_id').first()
+        )
+        root = Category.objects.filter(parent=None).values('slug').first()
+        # The longest title word, since short leading ones tend to be
+        # stopwords that full-text search drops, leaving nothing to match
+        search = max(re.findall(r'\w+', top_post['title']), key=len).lower()
+
+        # Trending is fed by live traffic, so give it the most popular posts
+        # up front instead of depending on the order scenarios run in
+        bump_trending([
+            (post_id, category_id, 'view') for post_id, category_id in posts.values_list('id', 'category_id')[:20]
+        ])
+
+        scenarios = []
+        for sorting, ordering, search_term, category_slug in itertools.product(
+            [None, *POST_SORTING_FIELDS], [None, *POST_ORDERING_FIELDS], [None, search], [None, category['slug']],
+        ):
+            params = {'sorting': sorting, 'ordering': ordering, 'search': search_term, 'category': category_slug}
+            params = {key: value for key, value in params.items() if value}
+            name = ' '.join(f'{key}={value}' for key, value in params.items()) or 'default'
+            scenarios.append((f'posts-list {name}', 'get', 'posts-list', params))
+
+        events = [
+            {'type': event_type, 'target': 'post', 'slug': slug}
+            for slug in (top_post['slug'], tail_post['slug'])
+            for event_type in ('impression', 'click', 'view')
+        ]
+        scenarios += [
+            ('posts-list cursor', 'get', 'posts-list', {'cursor': ''}),
+            ('posts-trending', 'get', 'posts-trending', {}),
+            ('posts-detail popular', 'get', 'posts-detail', {'slug': top_post['slug']}),
+            ('posts-detail long-tail', 'get', 'posts-detail', {'slug': tail_post['slug']}),
+            ('posts-detail no-headings', 'get', 'posts-detail', {'slug': top_post['slug'], 'headings': 'false'}),
+            ('post-headings', 'get', 'post-headings', {'slug': top_post['slug']}),
+            ('search-suggest', 'get', 'search-suggest', {'q': search[:4]}),
+            ('analytics-history post', 'get', 'analytics-history', {'post': top_post['slug'], 'granularity': 'day'}),
+            ('category-list', 'get', 'category-list', {}),
+            ('category-list parent', 'get', 'category-list', {'parent_slug': root['slug']}),
+            ('category-tree', 'get', 'category-tree', {}),
+            ('category-posts', 'get', 'category-posts', {'slug': category['slug']}),
+            ('category-posts subcategories', 'get', 'category-posts', {'slug': root['slug'], 'subcategories': 'true'}),
+            ('increment-post-clicks', 'post', 'increment-post-clicks', {'slug': top_post['slug']}),
+            ('increment-category-clicks', 'post', 'increment-category-clicks', {'slug': category['slug']}),
+            ('analytics-events', 'post', 'analytics-events', events),
+        ]
+        return scenarios
+
+    def run_scenarios(self, scenarios, options):
+        client = APIClient()
+        headers = {'HTTP_API_KEY': settings.VALID_API_KEYS[0]}
+        modes = ('cold', 'warm') if options['mode'] == 'both' else (options['mode'],)
+        counter = RedisCommandCounter()
+
+        results = []
+        for mode in modes:
+            with ExitStack() as stack:
+                if mode == 'cold':
+                    stack.enter_context(override_settings(CACHES=COLD_CACHES))
+                for name, method, url_name, payload in scenarios:
+                    url = reverse(url_name)
+
+                    def request():
+                        if method == 'post':
+                            return client.post(url, payload, format='json', **headers)
+                        return client.get(url, payload, **headers)
+
+                    for _ in range(options['warmup']):
+                        request()
+
+                    timings, queries, commands, sizes, statuses = [], [], [], [], set()
+                    for _ in range(options['repeat']):
+                        counter.commands = 0
+                        with CaptureQueriesContext(connection) as context, counter.active():
+                            start = time.perf_counter()
+                            response = request()
+                            timings.append((time.perf_counter() - start) * 1000)
+                        queries.append(len(context.captured_queries))
+                        commands.append(counter.commands)
+                        sizes.append(len(response.content))
+                        statuses.add(response.status_code)
+
+                    results.append({
+                        'name': name,
+                        'mode': mode,
+                        'status': sorted(statuses),
+                        **{f'p{percent}_ms': round(percentile(timings, percent), 2) for percent in PERCENTILES},
+                        'queries': round(statistics.median(queries)),
+                        'redis_commands': round(statistics.median(commands)),
+                        'bytes': round(statistics.median(sizes)),
+                    })
+        return results
+
+    def print_results(self, results):
+        width = max(len(result['name']) for result in results)
+        self.stdout.write(
+            f"{'endpoint':<{width}}  mode  {'p50':>8} {'p95':>8} {'p99':>8}  queries  redis  {'bytes':>8}  status"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['name']:<{width}}  {result['mode']:<4}  "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}  "
+                f"{result['queries']:>7}  {result['redis_commands']:>5}  {result['bytes']:>8}  "
+                f"{','.join(map(str, result['status']))}"
+            )
+
+    def compare(self, results, path, threshold):
+        with open(path) as baseline_file:
+            baseline = {(result['name'], result['mode']): result for result in json.load(baseline_file)['results']}
+
+        changes = 0
+        for result in results:
+            previous = baseline.get((result['name'], result['mode']))
+            if previous is None:
+                continue
+            notes = [
+                f'{field} {previous[field]} -> {result[field]}'
+                for field in ('queries', 'redis_commands', 'bytes', 'status')
+                if previous.get(field) != result[field]
+            ]
+            if previous['p95_ms'] and result['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+                notes.append(f"p95 {previous['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+            if notes:
+                changes += 1
+                self.stdout.write(f"{result['name']} ({result['mode']}): {', '.join(notes)}")
+
+        self.stdout.write(f'{changes} of {len(results)} results changed against {path}.')
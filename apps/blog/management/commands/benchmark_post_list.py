@@ -0,0 +1,68 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from apps.blog.models import Category, Post, PostAnalytics
+from apps.blog.projections import project_post_list, render_post_list
+from apps.blog.serializers import PostListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares PostListSerializer against the projected post list renderer on synthetic posts (rolled back afterwards).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        with transaction.atomic():
+            category = Category.objects.create(name='Benchmark', slug=f'benchmark-{uuid.uuid4().hex[:8]}')
+            Post.objects.bulk_create([
+                Post(
+                    title=f'Benchmark post {i}',
+                    description='A post generated for the list benchmark',
+                    content='<p>Benchmark</p>',
+                    thumbnail=f'thumbnails/blog/benchmark/{i}.png',
+                    keywords='benchmark',
+                    slug=f'bench-{i}',
+                    category=category,
+                    status='published',
+                )
+                for i in range(rows)
+            ], batch_size=5_000)
+            posts = Post.postobjects.filter(category=category).order_by('-created_at', '-id')
+            PostAnalytics.objects.bulk_create([PostAnalytics(post_id=post_id) for post_id in posts.values_list('id', flat=True)])
+
+            # The queryset the list views used before the projection
+            serializer_posts = posts.select_related('category').prefetch_related(
+                Prefetch('post_analytics', to_attr='analytics_cache')
+            )
+
+            def serializer():
+                return PostListSerializer(serializer_posts.all(), many=True).data
+
+            def projection():
+                return render_post_list(project_post_list(posts))
+
+            if JSONRenderer().render(serializer()) != JSONRenderer().render(projection()):
+                self.stderr.write('The projection output differs from PostListSerializer.')
+
+            for label, run in (('serializer', serializer), ('projection', projection)):
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    run()
+                    timings.append((time.perf_counter() - start) * 1000 * 1000 / rows)
+                self.stdout.write(
+                    f'{label:>10}: median {statistics.median(timings):.2f} ms, '
+                    f'min {min(timings):.2f} ms per 1,000 rows over {len(timings)} runs'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from faker.providers.lorem.en_US import Provider as LoremProvider
+
+from apps.blog.models import Category, Post
+from apps.blog.search import full_text_search_enabled, search_posts, update_post_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Compares full-text search against the legacy icontains search on a synthetic corpus (rolled back afterwards).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument('--query', action='append', dest='queries')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not full_text_search_enabled():
+            raise CommandError('Full-text search needs PostgreSQL; the configured database is %s.' % connection.vendor)
+
+        random.seed(options['seed'])
+        words = LoremProvider.word_list
+        queries = options['queries'] or [' '.join(random.sample(words, 2)) for _ in range(5)]
+
+        with transaction.atomic():
+            self.build_corpus(options['posts'], options['batch_size'], words)
+
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE blog_post')
+
+            for label, run in (('icontains', self.icontains_search), ('full-text', self.full_text_search)):
+                timings = []
+                for query in queries:
+                    for _ in range(options['repeat']):
+                        start = time.perf_counter()
+                        run(query, options['page_size'])
+                        timings.append((time.perf_counter() - start) * 1000)
+                self.report(label, timings)
+
+            transaction.set_rollback(True)
+
+    def build_corpus(self, total, batch_size, words):
+        category = Category.objects.create(name='Benchmark', slug=f'benchmark-{uuid.uuid4().hex[:8]}')
+
+        def text(count):
+            return ' '.join(random.choices(words, k=count))
+
+        self.stdout.write(f'Generating {total} posts...')
+        created = 0
+        while created < total:
+            size = min(batch_size, total - created)
+            Post.objects.bulk_create([
+                Post(
+                    title=text(6)[:128],
+                    description=text(12)[:256],
+                    content='<p>%s</p>' % text(200),
+                    keywords=', '.join(random.sample(words, 5))[:128],
+                    slug=f'bench-{created + i}',
+                    category=category,
+                    status='published',
+                )
+                for i in range(size)
+            ], batch_size=size)
+            created += size
+
+        update_post_search_vector(Post.objects.filter(category=category))
+
+    def icontains_search(self, search, page_size):
+        posts = Post.postobjects.filter(
+            Q(title__icontains=search) |
+            Q(description__icontains=search) |
+            Q(content__icontains=search) |
+            Q(keywords__icontains=search)
+        ).order_by('-created_at')
+        return list(posts[:page_size])
+
+    def full_text_search(self, search, page_size):
+        posts = search_posts(Post.postobjects.all(), search).order_by('-rank', '-id')
+        return list(posts[:page_size])
+
+    def report(self, label, timings):
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f'{label:>10}: median {statistics.median(timings):.2f} ms, '
+            f'p95 {p95:.2f} ms, max {timings[-1]:.2f} ms over {len(timings)} runs'
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.response_cache import reset_response_cache_stats, response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Reports how many response bytes the blog cache has stored and served.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the counters after reporting.')
+
+    def handle(self, *args, **options):
+        stats = response_cache_stats()
+        if not stats:
+            self.stdout.write('No cached responses recorded yet.')
+        for field, value in sorted(stats.items()):
+            self.stdout.write(f'{field}: {value}')
+
+        if options['reset']:
+            reset_response_cache_stats()
@@ -0,0 +1,172 @@
+import ipaddress
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+from faker import Faker
+
+from apps.blog.caching import POST_LIST_NAMESPACE, CATEGORIES_NAMESPACE, SUGGEST_NAMESPACE, bump_versions
+from apps.blog.counters import add_lifetime_unique_viewers
+from apps.blog.models import (
+    PATH_SEPARATOR,
+    Category,
+    CategoryAnalytics,
+    Heading,
+    Post,
+    PostAnalytics,
+    PostView,
+    exact_unique_views,
+)
+from apps.blog.search import update_post_search_vector
+from apps.blog.seeding import generate_posts, zipf_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk generates a synthetic corpus of categories, posts, headings, views and analytics for load testing. '
+        'Post popularity follows a Zipf distribution.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--depth', type=int, default=3, help='Maximum depth of the category tree.')
+        parser.add_argument('--max-headings', type=int, default=6)
+        parser.add_argument('--views', type=int, default=None, help='Total unique views to spread (default: 10 per post).')
+        parser.add_argument('--zipf-exponent', type=float, default=1.1)
+        parser.add_argument('--published-ratio', type=float, default=0.9)
+        parser.add_argument('--batch-size', type=int, default=2_000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['posts'] < 0 or options['categories'] < 1 or options['depth'] < 1:
+            raise CommandError('--posts must be >= 0, --categories and --depth >= 1.')
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        category_ids = self.create_categories(options['categories'], options['depth'], rng)
+        self.stdout.write(f'Created {len(category_ids)} categories.')
+
+        total_views = options['views'] if options['views'] is not None else options['posts'] * 10
+        popularity = zipf_counts(total_views, options['posts'], options['zipf_exponent'], rng)
+
+        jobs = []
+        for offset in range(0, options['posts'], options['batch_size']):
+            count = min(options['batch_size'], options['posts'] - offset)
+            jobs.append((rng.getrandbits(32), count, options['max_headings'], options['published_ratio']))
+
+        # Workers are spawned rather than forked so they never share this
+        # process's database connections; they only generate text
+        category_views = Counter()
+        created = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as executor:
+            pending = deque()
+            for job in jobs:
+                pending.append(executor.submit(generate_posts, job))
+                # Keep a few batches in flight without buffering the corpus
+                if len(pending) < options['workers'] * 2:
+                    continue
+                created += self.insert_posts(pending.popleft().result(), popularity, created, category_ids, category_views, rng)
+            while pending:
+                created += self.insert_posts(pending.popleft().result(), popularity, created, category_ids, category_views, rng)
+
+        CategoryAnalytics.objects.bulk_update(
+            [
+                CategoryAnalytics(id=analytics_id, views=category_views[category_id])
+                for analytics_id, category_id in CategoryAnalytics.objects.filter(
+                    category_id__in=category_ids
+                ).values_list('id', 'category_id')
+            ],
+            ['views'],
+            batch_size=options['batch_size'],
+        )
+        bump_versions(POST_LIST_NAMESPACE, CATEGORIES_NAMESPACE, SUGGEST_NAMESPACE)
+
+        self.stdout.write(f'Created {created} posts with {sum(popularity)} views in {time.perf_counter() - started:.1f}s.')
+
+    def create_categories(self, count, depth, rng):
+        """
+        Builds a random tree no deeper than `depth` levels, filling in the
+        materialized paths `Category.save` would compute.
+        """
+        fake = Faker()
+        fake.seed_instance(rng.getrandbits(32))
+
+        categories = []
+        parents = [None]
+        for _ in range(count):
+            parent = rng.choice(parents)
+            category_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+            name = fake.word().capitalize()
+            path = f"{parent.path if parent else ''}{category_id.hex}{PATH_SEPARATOR}"
+            category = Category(
+                id=category_id,
+                parent=parent,
+                name=name,
+                title=fake.sentence(nb_words=4).rstrip('.'),
+                description=fake.paragraph(),
+                slug=f'{slugify(name)}-{category_id.hex[:8]}',
+                path=path,
+                depth=path.count(PATH_SEPARATOR) - 1,
+            )
+            categories.append(category)
+            if category.depth < depth - 1:
+                parents.append(category)
+
+        with transaction.atomic():
+            Category.objects.bulk_create(categories)
+            CategoryAnalytics.objects.bulk_create([CategoryAnalytics(category=category) for category in categories])
+        return [category.id for category in categories]
+
+    def insert_posts(self, rows, popularity, offset, category_ids, category_views, rng):
+        exact = exact_unique_views()
+        posts, headings, analytics, views, viewers = [], [], [], [], {}
+
+        for index, row in enumerate(rows):
+            post_views = popularity[offset + index]
+            category_id = rng.choice(category_ids)
+            category_views[category_id] += post_views
+
+            posts.append(Post(category_id=category_id, popularity=post_views, **row))
+            headings.extend(Heading(post_id=row['id'], **entry) for entry in row['toc'])
+
+            impressions = post_views * rng.randint(3, 20)
+            analytics.append(PostAnalytics(
+                post_id=row['id'],
+                views=post_views,
+                impressions=impressions,
+                clicks=int(impressions * rng.uniform(0.01, 0.15)),
+                avg_time_on_page=round(rng.uniform(10, 300), 2),
+                time_on_page_samples=post_views,
+            ))
+
+            # Consecutive addresses from a random start are unique per post
+            start = rng.randrange(2 ** 32 - post_views)
+            ip_addresses = [str(ipaddress.IPv4Address(start + number)) for number in range(post_views)]
+            views.extend(PostView(post_id=row['id'], ip_address=ip_address) for ip_address in ip_addresses)
+            if ip_addresses:
+                viewers[str(row['id'])] = ip_addresses
+
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            Heading.objects.bulk_create(headings, batch_size=5_000)
+            PostAnalytics.objects.bulk_create(analytics)
+            PostView.objects.bulk_create(views, batch_size=5_000)
+            update_post_search_vector(Post.objects.filter(id__in=[post.id for post in posts]))
+
+        # Unique views are estimated from HyperLogLogs unless exact mode keeps rows
+        if viewers and not exact:
+            add_lifetime_unique_viewers('post', viewers)
+
+        self.stdout.write(f'  {offset + len(rows)} posts')
+        return len(rows)
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.blog.tasks import THUMBNAIL_SWEEP_MIN_AGE, sweep_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Deletes thumbnails and variants that no post or category references any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=THUMBNAIL_SWEEP_MIN_AGE.total_seconds() / 3600,
+            help='Leave files modified more recently than this alone.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='List the files without deleting them.')
+
+    def handle(self, *args, **options):
+        removed = sweep_thumbnails(min_age=timedelta(hours=options['min_age_hours']), dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f'{verb} {len(removed)} unreferenced thumbnail files.')
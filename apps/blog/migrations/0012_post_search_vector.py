@@ -0,0 +1,54 @@
+# Generated by Django 5.1.6 on 2026-10-17 05:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_post_search_gin')
+
+
+# GIN indexes and tsvector functions only exist on PostgreSQL, so the database
+# side is skipped on other backends (SQLite test runs) while the state still
+# records the index.
+def add_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('blog', 'Post'), SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('blog', 'Post'), SEARCH_INDEX)
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from apps.blog.search import post_search_vector
+
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.using(schema_editor.connection.alias).update(search_vector=post_search_vector())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_categoryanalytics_categoryview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='post', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-17 05:51
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('Category', django.contrib.postgres.indexes.GinIndex(fields=['name'], name='blog_category_name_trgm', opclasses=['gin_trgm_ops'])),
+    ('Post', django.contrib.postgres.indexes.GinIndex(fields=['title'], name='blog_post_title_trgm', opclasses=['gin_trgm_ops'])),
+)
+
+
+# pg_trgm is a contrib extension that may not be installed on every server;
+# without it the suggest endpoint falls back to its in-memory prefix index.
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for model_name, index in TRIGRAM_INDEXES:
+        schema_editor.add_index(apps.get_model('blog', model_name), index)
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for model_name, index in TRIGRAM_INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS %s' % schema_editor.quote_name(index.name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name.lower(), index=index)
+                for model_name, index in TRIGRAM_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.6 on 2026-10-17 05:56
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Concurrent requests could slip past the old exists() check, so drop
+# duplicate rows (keeping the earliest) before adding the constraints.
+def remove_duplicate_views(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    for model_name, fk_name in (('PostView', 'post'), ('CategoryView', 'category')):
+        model = apps.get_model('blog', model_name)
+        duplicates = (
+            model.objects.using(alias)
+            .values(fk_name, 'ip_address')
+            .annotate(rows=Count('id'))
+            .filter(rows__gt=1)
+        )
+        for duplicate in duplicates:
+            rows = model.objects.using(alias).filter(
+                **{fk_name: duplicate[fk_name], 'ip_address': duplicate['ip_address']}
+            ).order_by('timestamp', 'id')
+            model.objects.using(alias).filter(pk__in=list(rows.values_list('pk', flat=True)[1:])).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_views, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='categoryview',
+            constraint=models.UniqueConstraint(fields=('category', 'ip_address'), name='unique_category_view_per_ip'),
+        ),
+        migrations.AddConstraint(
+            model_name='postview',
+            constraint=models.UniqueConstraint(fields=('post', 'ip_address'), name='unique_post_view_per_ip'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-17 05:57
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_unique_views_per_ip'),
+    ]
+
+    # A column cannot be altered into a generated one, so it is dropped and
+    # re-added; the database recomputes every existing row.
+    operations = [
+        migrations.RemoveField(
+            model_name='categoryanalytics',
+            name='click_through_rate',
+        ),
+        migrations.AddField(
+            model_name='categoryanalytics',
+            name='click_through_rate',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(impressions__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('clicks', models.FloatField()), '*', models.Value(100.0)), '/', models.F('impressions'))), default=models.Value(0.0)), output_field=models.FloatField()),
+        ),
+        migrations.RemoveField(
+            model_name='postanalytics',
+            name='click_through_rate',
+        ),
+        migrations.AddField(
+            model_name='postanalytics',
+            name='click_through_rate',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(impressions__gt=0, then=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('clicks', models.FloatField()), '*', models.Value(100.0)), '/', models.F('impressions'))), default=models.Value(0.0)), output_field=models.FloatField()),
+        ),
+    ]
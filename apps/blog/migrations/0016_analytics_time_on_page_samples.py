@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_analytics_generated_ctr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoryanalytics',
+            name='time_on_page_samples',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='postanalytics',
+            name='time_on_page_samples',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
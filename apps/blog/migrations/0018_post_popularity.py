@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_views_to_popularity(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    PostAnalytics = apps.get_model('blog', 'PostAnalytics')
+    Post.objects.using(schema_editor.connection.alias).update(popularity=Coalesce(
+        Subquery(PostAnalytics.objects.filter(post=OuterRef('pk')).values('views')[:1]),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='popularity',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(copy_views_to_popularity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['status', '-popularity', '-id'], name='blog_post_popular_idx'),
+        ),
+    ]
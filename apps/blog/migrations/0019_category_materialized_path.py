@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:12
+
+from django.db import migrations, models
+
+
+# Fills the paths level by level, starting from the root categories
+def build_category_paths(apps, schema_editor):
+    Category = apps.get_model('blog', 'Category')
+    categories = Category.objects.using(schema_editor.connection.alias)
+
+    parents = {None: ('', -1)}
+    level = list(categories.filter(parent__isnull=True))
+    while level:
+        for category in level:
+            parent_path, parent_depth = parents[category.parent_id]
+            category.path = f'{parent_path}{category.id.hex}/'
+            category.depth = parent_depth + 1
+        categories.bulk_update(level, ['path', 'depth'])
+
+        parents = {category.id: (category.path, category.depth) for category in level}
+        level = list(categories.filter(parent_id__in=list(parents)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0018_post_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=1024),
+        ),
+        migrations.RunPython(build_category_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='blog_category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
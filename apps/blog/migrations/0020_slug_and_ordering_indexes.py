@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:14
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Slugs were never unique, so every row sharing a slug but the first keeps
+# it with a short id suffix appended before the constraints are added.
+def make_slugs_unique(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    for model_name, ordering in (('Post', ('created_at', 'id')), ('Category', ('id',))):
+        model = apps.get_model('blog', model_name)
+        max_length = model._meta.get_field('slug').max_length
+        duplicates = (
+            model.objects.using(alias)
+            .values('slug')
+            .annotate(rows=Count('id'))
+            .filter(rows__gt=1)
+            .values_list('slug', flat=True)
+        )
+        for slug in list(duplicates):
+            rows = model.objects.using(alias).filter(slug=slug).order_by(*ordering)
+            for row in rows[1:]:
+                suffix = f'-{row.id.hex[:8]}'
+                model.objects.using(alias).filter(pk=row.pk).update(slug=slug[:max_length - len(suffix)] + suffix)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0019_category_materialized_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_slugs_unique, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='blog_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-updated_at', '-id'], name='blog_post_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('slug',), name='unique_category_slug'),
+        ),
+        migrations.AddConstraint(
+            model_name='post',
+            constraint=models.UniqueConstraint(fields=('slug',), name='unique_post_slug'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+# Parse every post once. Posts whose content has no headings get the ones
+# entered by hand in the admin written into it as anchored tags, so the
+# table of contents survives the heading sync on the next save.
+def build_tables_of_contents(apps, schema_editor):
+    from html import escape
+
+    from apps.blog.toc import build_table_of_contents
+
+    alias = schema_editor.connection.alias
+    Post = apps.get_model('blog', 'Post')
+    Heading = apps.get_model('blog', 'Heading')
+
+    for post in Post.objects.using(alias).only('id', 'content').iterator():
+        headings = Heading.objects.using(alias).filter(post_id=post.pk)
+        content, toc = build_table_of_contents(post.content)
+        if not toc:
+            manual = ''.join(
+                f'<h{level} id="{escape(slug)}">{escape(title, quote=False)}</h{level}>'
+                for title, slug, level in headings.order_by('order').values_list('title', 'slug', 'level')
+                for level in [min(max(level, 1), 6)]
+            )
+            if manual:
+                content, toc = build_table_of_contents(manual + content)
+        if toc:
+            headings.delete()
+            Heading.objects.using(alias).bulk_create([Heading(post_id=post.pk, **entry) for entry in toc])
+        Post.objects.using(alias).filter(pk=post.pk).update(content=content, toc=toc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_slug_and_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='toc',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(build_tables_of_contents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:18
+
+from django.db import migrations, models
+
+
+def render_post_content(apps, schema_editor):
+    from apps.blog.content import render_content
+
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias)
+    for post in posts.only('id', 'content').iterator():
+        posts.filter(pk=post.pk).update(**render_content(post.content))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_post_table_of_contents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_post_content, migrations.RunPython.noop),
+    ]
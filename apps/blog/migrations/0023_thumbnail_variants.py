@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0022_post_content_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='thumbnail_variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', 'title', 'id'], name='blog_post_title_idx'),
+        ),
+    ]
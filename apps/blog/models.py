@@ -1,19 +1,177 @@
 import uuid
-from django.db import models
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Max, Value
+from django.db.models.functions import Cast, Concat, JSONObject, Length, Substr
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.text import slugify
 from ckeditor.fields import RichTextField
 
 from .utils import get_client_ip
-
+from .search import SEARCHABLE_POST_FIELDS, update_post_search_vector
+from .toc import build_table_of_contents
+from .content import CONTENT_DERIVED_FIELDS, render_content
+from .thumbnails import variants_are_current
+from .counters import (
+    VIEWS_METRIC,
+    counter_pipeline,
+    add_counts,
+    add_unique_viewer,
+    mark_unique_viewers_dirty,
+)
+from .caching import (
+    POST_LIST_NAMESPACE,
+    CATEGORIES_NAMESPACE,
+    SUGGEST_NAMESPACE,
+    bump_versions_on_commit,
+    post_namespace,
+    category_namespace,
+)
+
+PATH_SEPARATOR = '/'
+PATH_MAX_LENGTH = 1024
+# Every level adds a 32 character id and a separator to the path
+CATEGORY_MAX_DEPTH = PATH_MAX_LENGTH // 33
+
+
+def path_ids(path):
+    return [uuid.UUID(segment) for segment in path.split(PATH_SEPARATOR) if segment]
+
+
+class InPath(models.Lookup):
+    """
+    Matches ids listed in a materialized path, as a primary key lookup on
+    PostgreSQL.
+    """
+
+    lookup_name = 'in_path'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        ids = f"string_to_array(rtrim({rhs}, '{PATH_SEPARATOR}'), '{PATH_SEPARATOR}')::uuid[]"
+        return f'{lhs} = ANY({ids})', [*lhs_params, *rhs_params]
+
+
+# The storage renames uploads after their content hash, so the directory
+# no longer includes the (renameable) post title or category name
 def blog_thumbnail_directory(instance, filename):
-    return "thumbnails/blog/{0}/{1}".format(instance.title, filename)
+    return "thumbnails/blog/{0}".format(filename)
 
 
 def category_thumbnail_directory(instance, filename):
-    return "thumbnails/blog_categories/{0}/{1}".format(instance.name, filename)
+    return "thumbnails/blog_categories/{0}".format(filename)
+
+
+def exact_unique_views():
+    # Exact mode keeps one PostView/CategoryView row per visitor instead of
+    # a HyperLogLog estimate, for deployments that need auditable counts.
+    return getattr(settings, 'BLOG_EXACT_UNIQUE_VIEWS', False)
+
+
+class AnalyticsCounters(models.Model):
+    """
+    Counters shared by every analytics model. Subclasses add a one-to-one
+    `target_field` to the tracked object and name its `view_model`.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    views = models.PositiveIntegerField(default=0)
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    click_through_rate = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                impressions__gt=0,
+                then=Cast('clicks', models.FloatField()) * 100.0 / models.F('impressions'),
+            ),
+            default=models.Value(0.0),
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
+    avg_time_on_page = models.FloatField(default=0)
+    # Number of dwell samples behind avg_time_on_page, to keep it a running mean
+    time_on_page_samples = models.PositiveIntegerField(default=0)
+
+    counter_kind = None
+    target_field = None
+    view_model = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def increment(cls, target_id, **deltas):
+        # A single UPDATE ... SET field = field + n, so concurrent increments never overwrite each other
+        return cls.objects.filter(**{f'{cls.target_field}_id': target_id}).update(
+            **{field: models.F(field) + amount for field, amount in deltas.items()}
+        )
+
+    def increment_counters(self, **deltas):
+        type(self).objects.filter(pk=self.pk).update(
+            **{field: models.F(field) + amount for field, amount in deltas.items()}
+        )
+        self.refresh_from_db(fields=[*deltas, 'click_through_rate'])
+
+    def increment_click(self):
+        self.increment_counters(clicks=1)
+
+    def increment_impressions(self):
+        self.increment_counters(impressions=1)
+
+    def increment_view(self, ip_address):
+        self.record_view(getattr(self, f'{self.target_field}_id'), ip_address)
+
+    @classmethod
+    def record_view(cls, target_id, ip_address, pipe=None):
+        # `views` is materialized later by the unique viewers task; the raw
+        # view is also counted for the hourly history
+        execute = pipe is None
+        if execute:
+            pipe = counter_pipeline()
+        if exact_unique_views():
+            cls.view_model.objects.bulk_create(
+                [cls.view_model(**{f'{cls.target_field}_id': target_id, 'ip_address': ip_address})],
+                ignore_conflicts=True,
+            )
+            mark_unique_viewers_dirty(cls.counter_kind, [target_id], pipe=pipe)
+        else:
+            add_unique_viewer(cls.counter_kind, target_id, ip_address, pipe=pipe)
+        add_counts(VIEWS_METRIC, cls.counter_kind, {target_id: 1}, pipe=pipe)
+        if execute:
+            pipe.execute()
+
+
+class AnalyticsRollup(models.Model):
+    """
+    One time bucket of counter history. The flush writes hourly buckets,
+    which are compacted into daily ones once older than the retention window.
+    """
+
+    granularity_options = (
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    granularity = models.CharField(max_length=4, choices=granularity_options, default='hour')
+    start = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    counter_kind = None
+    target_field = None
+
+    class Meta:
+        abstract = True
 
 
 class Category(models.Model):
@@ -25,10 +183,96 @@ class Category(models.Model):
     title = models.CharField(max_length=255, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     thumbnail = models.ImageField(upload_to=category_thumbnail_directory, blank=True, null=True)
+    # Resized copies of `thumbnail`, written by the thumbnail variants task
+    thumbnail_variants = models.JSONField(default=dict, editable=False)
     slug = models.CharField(max_length=128)
 
+    # Materialized path: the ids of the root, ..., this category, each
+    # followed by a separator, so a subtree is a `path__startswith` prefix scan
+    path = models.CharField(max_length=PATH_MAX_LENGTH, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['name'], name='blog_category_name_trgm', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['path'], name='blog_category_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['slug'], name='unique_category_slug'),
+        ]
+
     def __str__(self):
         return self.name
+
+    def clean(self):
+        super().clean()
+        self.resolve_path()
+
+    def resolve_path(self):
+        """
+        Returns the stored and the new materialized path for the current
+        parent, raising ValidationError when that parent is the category
+        itself or one of its descendants, or when the move would nest it or
+        any descendant deeper than a path can hold.
+        """
+        previous_path = None
+        if not self._state.adding:
+            previous_path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+
+        parent_path = self.parent.path if self.parent_id else ''
+        if self.parent_id == self.pk or (previous_path and parent_path.startswith(previous_path)):
+            raise ValidationError({'parent': 'A category cannot be moved under itself or its descendants.'})
+
+        path = f'{parent_path}{self.id.hex}{PATH_SEPARATOR}'
+        longest = len(path)
+        if previous_path and previous_path != path:
+            subtree = Category.objects.filter(path__startswith=previous_path).aggregate(longest=Max(Length('path')))
+            longest += (subtree['longest'] or len(previous_path)) - len(previous_path)
+        if longest > PATH_MAX_LENGTH:
+            raise ValidationError({'parent': f'Categories cannot be nested more than {CATEGORY_MAX_DEPTH} levels deep.'})
+        return previous_path, path
+
+    def save(self, *args, **kwargs):
+        # Also enforced here, since a corrupt path would hide whole subtrees
+        previous_path, self.path = self.resolve_path()
+        self.depth = self.path.count(PATH_SEPARATOR) - 1
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'path', 'depth'}
+        super().save(*args, **kwargs)
+
+        if previous_path and previous_path != self.path:
+            # Re-root every descendant in one UPDATE
+            Category.objects.filter(path__startswith=previous_path).exclude(pk=self.pk).update(
+                path=Concat(Value(self.path), Substr('path', len(previous_path) + 1)),
+                depth=models.F('depth') + (self.depth - (previous_path.count(PATH_SEPARATOR) - 1)),
+            )
+
+    def ancestor_ids(self):
+        return path_ids(self.path)
+
+    def get_descendants(self, include_self=True):
+        categories = Category.objects.filter(path__startswith=self.path)
+        return categories if include_self else categories.exclude(pk=self.pk)
+
+    def get_ancestors(self, include_self=True):
+        ancestors = Category.objects.filter(id__in=self.ancestor_ids()).order_by('depth')
+        return ancestors if include_self else ancestors.exclude(pk=self.pk)
+
+    @classmethod
+    def breadcrumbs(cls, path):
+        """
+        PostgreSQL expression for the name and slug of every category in the
+        materialized `path` (an OuterRef to a category's path), root first,
+        so a query that already joins the category returns its breadcrumbs
+        without another round trip.
+        """
+        return ArraySubquery(
+            cls.objects.filter(InPath(models.F('id'), path))
+            .order_by('depth')
+            .values(crumb=JSONObject(name='name', slug='slug'))
+        )
     
 
 class CategoryView(models.Model):
@@ -38,40 +282,32 @@ class CategoryView(models.Model):
     ip_address = models.GenericIPAddressField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'ip_address'], name='unique_category_view_per_ip'),
+        ]
 
-class CategoryAnalytics(models.Model):
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+class CategoryAnalytics(AnalyticsCounters):
+
     category = models.OneToOneField(Category, on_delete=models.CASCADE, related_name='category_analytics')
-    views = models.PositiveIntegerField(default=0)
-    impressions = models.PositiveIntegerField(default=0)
-    clicks = models.PositiveIntegerField(default=0)
-    click_through_rate = models.FloatField(default=0)
-    avg_time_on_page = models.FloatField(default=0)
 
-    def _update_click_through_rate(self):
-        if self.impressions > 0:
-            self.click_through_rate = (self.clicks/self.impressions) * 100
-        else:
-            self.click_through_rate = 0
-        self.save()
+    counter_kind = 'category'
+    target_field = 'category'
+    view_model = CategoryView
 
-    def increment_click(self):
-        self.clicks += 1
-        self.save()
-        self._update_click_through_rate()
 
-    def increment_impressions(self):
-        self.impressions += 1
-        self.save()
-        self._update_click_through_rate()
+class CategoryAnalyticsRollup(AnalyticsRollup):
 
-    def increment_view(self, ip_address):
-        if not CategoryView.objects.filter(category=self.category, ip_address=ip_address).exists():
-            CategoryView.objects.create(category=self.category, ip_address=ip_address)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='analytics_rollups')
+
+    counter_kind = 'category'
+    target_field = 'category'
 
-            self.views += 1
-            self.save()
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'granularity', 'start'], name='unique_category_rollup_bucket'),
+        ]
 
 
 class Post(models.Model):
@@ -91,11 +327,24 @@ class Post(models.Model):
     description = models.CharField(max_length=256)
     content = RichTextField()
     thumbnail = models.ImageField(upload_to=blog_thumbnail_directory)
+    # Resized copies of `thumbnail`, written by the thumbnail variants task
+    thumbnail_variants = models.JSONField(default=dict, editable=False)
     keywords = models.CharField(max_length=128)
     slug = models.CharField(max_length=128)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
     status = models.CharField(max_length=10, choices=status_options, default='draft')
     views = models.IntegerField(default=0)
+    # All-time unique views copied from PostAnalytics by the views task, so
+    # most_viewed lists are an index scan instead of a join and sort
+    popularity = models.PositiveIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Headings parsed out of `content` on save, in the shape the API returns
+    toc = models.JSONField(default=list, editable=False)
+    # Also derived from `content` on save; `content_html` is what the API serves
+    content_html = models.TextField(blank=True, default='', editable=False)
+    excerpt = models.CharField(max_length=300, blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
 
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -105,9 +354,37 @@ class Post(models.Model):
 
     class Meta:
         ordering = ('status', '-created_at',)
+        indexes = [
+            GinIndex(fields=['search_vector'], name='blog_post_search_gin'),
+            GinIndex(fields=['title'], name='blog_post_title_trgm', opclasses=['gin_trgm_ops']),
+            models.Index(
+                fields=['status', '-popularity', '-id'],
+                condition=models.Q(status='published'),
+                name='blog_post_popular_idx',
+            ),
+            # Match the default ordering and the newest / recently updated
+            # sorts, including the `id` tie breaker keyset pagination adds
+            models.Index(fields=['status', '-created_at', '-id'], name='blog_post_created_idx'),
+            models.Index(fields=['status', '-updated_at', '-id'], name='blog_post_updated_idx'),
+            # A-Z lists; Z-A ones read it backwards
+            models.Index(fields=['status', 'title', 'id'], name='blog_post_title_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['slug'], name='unique_post_slug'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.content, self.toc = build_table_of_contents(self.content)
+            for field, value in render_content(self.content).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'toc', *CONTENT_DERIVED_FIELDS}
+        super().save(*args, **kwargs)
     
 
 class PostView(models.Model):
@@ -117,40 +394,32 @@ class PostView(models.Model):
     ip_address = models.GenericIPAddressField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'ip_address'], name='unique_post_view_per_ip'),
+        ]
 
-class PostAnalytics(models.Model):
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+class PostAnalytics(AnalyticsCounters):
+
     post = models.OneToOneField(Post, on_delete=models.CASCADE, related_name='post_analytics')
-    views = models.PositiveIntegerField(default=0)
-    impressions = models.PositiveIntegerField(default=0)
-    clicks = models.PositiveIntegerField(default=0)
-    click_through_rate = models.FloatField(default=0)
-    avg_time_on_page = models.FloatField(default=0)
 
-    def _update_click_through_rate(self):
-        if self.impressions > 0:
-            self.click_through_rate = (self.clicks/self.impressions) * 100
-        else:
-            self.click_through_rate = 0
-        self.save()
+    counter_kind = 'post'
+    target_field = 'post'
+    view_model = PostView
 
-    def increment_click(self):
-        self.clicks += 1
-        self.save()
-        self._update_click_through_rate()
 
-    def increment_impressions(self):
-        self.impressions += 1
-        self.save()
-        self._update_click_through_rate()
+class PostAnalyticsRollup(AnalyticsRollup):
 
-    def increment_view(self, ip_address):
-        if not PostView.objects.filter(post=self.post, ip_address=ip_address).exists():
-            PostView.objects.create(post=self.post, ip_address=ip_address)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='analytics_rollups')
+
+    counter_kind = 'post'
+    target_field = 'post'
 
-            self.views += 1
-            self.save()
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'granularity', 'start'], name='unique_post_rollup_bucket'),
+        ]
 
 
 class Heading(models.Model):
@@ -180,6 +449,28 @@ class Heading(models.Model):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def sync(cls, post_id, toc):
+        """
+        Makes the post's heading rows match `toc` with one read and at most
+        one bulk create, update and delete, matching rows by position.
+        """
+        existing = {heading.order: heading for heading in cls.objects.filter(post_id=post_id)}
+        created, updated = [], []
+        for entry in toc:
+            heading = existing.pop(entry['order'], None)
+            if heading is None:
+                created.append(cls(post_id=post_id, **entry))
+            elif any(getattr(heading, field) != value for field, value in entry.items()):
+                for field, value in entry.items():
+                    setattr(heading, field, value)
+                updated.append(heading)
+
+        cls.objects.bulk_create(created)
+        cls.objects.bulk_update(updated, ['title', 'slug', 'level'])
+        if existing:
+            cls.objects.filter(pk__in=[heading.pk for heading in existing.values()]).delete()
+
 
 @receiver(post_save, sender=Post)
 def create_post_analytics(sender, instance, created, **kwargs):
@@ -187,7 +478,76 @@ def create_post_analytics(sender, instance, created, **kwargs):
         PostAnalytics.objects.create(post=instance)
 
 
+@receiver(post_save, sender=Post)
+def sync_post_headings(sender, instance, update_fields=None, **kwargs):
+    if update_fields and 'content' not in update_fields:
+        return
+    Heading.sync(instance.pk, instance.toc)
+
+
+@receiver(post_save, sender=Post)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(SEARCHABLE_POST_FIELDS):
+        return
+    update_post_search_vector(Post.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Category)
+def queue_thumbnail_variants(sender, instance, **kwargs):
+    if variants_are_current(instance):
+        return
+
+    # Imported here because the tasks module imports the models
+    from .tasks import generate_thumbnail_variants
+
+    kind, object_id = sender._meta.model_name, str(instance.pk)
+    transaction.on_commit(lambda: generate_thumbnail_variants.delay(kind, object_id))
+
+
 @receiver(post_save, sender=Category)
 def create_category_analytics(sender, instance, created, **kwargs):
     if created:
         CategoryAnalytics.objects.create(category=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_cache_namespaces(sender, instance, **kwargs):
+    # A post whose slug or category changes must also invalidate the old ones
+    instance._previous_cache_namespaces = []
+    if instance._state.adding:
+        return
+
+    previous = Post.objects.filter(pk=instance.pk).values('slug', 'category_id', 'category__path').first()
+    if previous:
+        instance._previous_cache_namespaces = [post_namespace(previous['slug'])]
+        if previous['category_id'] != instance.category_id:
+            # The old category's ancestors listed it with their subcategories
+            old_slugs = Category.objects.filter(id__in=path_ids(previous['category__path'])).values_list('slug', flat=True)
+            instance._previous_cache_namespaces += [category_namespace(slug) for slug in old_slugs]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    # Ancestor categories list the post too when subcategories are included
+    ancestor_slugs = instance.category.get_ancestors().values_list('slug', flat=True)
+    bump_versions_on_commit(
+        POST_LIST_NAMESPACE,
+        SUGGEST_NAMESPACE,
+        post_namespace(instance.slug),
+        *[category_namespace(slug) for slug in ancestor_slugs],
+        *getattr(instance, '_previous_cache_namespaces', []),
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    bump_versions_on_commit(CATEGORIES_NAMESPACE, SUGGEST_NAMESPACE)
+
+
+@receiver(post_save, sender=Heading)
+@receiver(post_delete, sender=Heading)
+def invalidate_heading_cache(sender, instance, **kwargs):
+    bump_versions_on_commit(post_namespace(instance.post.slug))
@@ -0,0 +1,203 @@
+import base64
+import binascii
+import datetime
+import json
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_api.pagination import CustomPagination
+from rest_framework_api.serializers import APIResponseSerializer
+
+
+def paginated_payload(results, count=None, next_link=None, previous_link=None):
+    data = {
+        'success': True,
+        'status': status.HTTP_200_OK,
+        'results': results,
+        'next': next_link,
+        'previous': previous_link,
+    }
+    # Keyset pages have no total count
+    if count is not None:
+        data['count'] = count
+    return APIResponseSerializer(data).data
+
+
+def paginated_response(results, count=None, next_link=None, previous_link=None):
+    return Response(paginated_payload(results, count, next_link, previous_link))
+
+
+class PagePagination(CustomPagination):
+    """
+    `CustomPagination` (`?p=` and `?page_size=`) applied to a queryset, so the
+    database runs a COUNT plus LIMIT/OFFSET instead of Python slicing a fully
+    serialized list.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = super().paginate_queryset(queryset, request, view)
+        self.count = self.page.paginator.count
+        return page
+
+    def get_page_meta(self):
+        return {
+            'count': self.count,
+            'next_link': self.get_next_link(),
+            'previous_link': self.get_previous_link(),
+        }
+
+
+class KeysetPagination:
+    """
+    Seek ("keyset") pagination over an ordered queryset.
+
+    The position of the last row served is encoded into an opaque cursor and
+    turned back into a WHERE predicate on the next request, so the database
+    only reads `page_size + 1` rows no matter how deep the page is.
+    The ordering must end in a unique column (usually `id`).
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def __init__(self, ordering, page_size=6):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+        self.max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 100)
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self._get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self._reversed_ordering() if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self._clean_position(queryset, position)
+            queryset = queryset.filter(self._seek_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._build_link(self.page[0], reverse=True)
+
+    def get_page_meta(self):
+        return {
+            'next_link': self.get_next_link(),
+            'previous_link': self.get_previous_link(),
+        }
+
+    def get_paginated_response(self, data):
+        return paginated_response(data, **self.get_page_meta())
+
+    def encode_cursor(self, position, reverse=False):
+        payload = {'p': position}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param, '')
+        if not encoded:
+            return None, False
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(detail=self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(detail=self.invalid_cursor_message)
+        return position, reverse
+
+    def _build_link(self, instance, reverse):
+        position = [self._position_value(instance, field) for field in self.ordering]
+        cursor = self.encode_cursor(position, reverse=reverse)
+        url = remove_query_param(self.base_url, 'p')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _position_value(self, instance, field):
+        # Pages hold model instances or projected `.values()` rows
+        name = field.lstrip('-')
+        value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    def _clean_position(self, queryset, position):
+        # Cursors come from the client, so every value is converted the way
+        # its column would be; a tampered one is an invalid cursor, not a 500
+        cleaned = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            if name in queryset.query.annotations:
+                model_field = queryset.query.annotations[name].output_field
+            else:
+                model_field = queryset.model._meta.get_field(name)
+            try:
+                if value is None or isinstance(value, (list, dict)):
+                    raise ValidationError(self.invalid_cursor_message)
+                cleaned.append(model_field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(detail=self.invalid_cursor_message)
+        return cleaned
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _seek_filter(self, ordering, position):
+        # (a, b, c) > (x, y, z) expanded as a > x OR (a = x AND b > y) OR ...
+        predicate = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            predicate |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return predicate
+
+    def _get_page_size(self, request):
+        page_size = self.page_size
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            pass
+
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
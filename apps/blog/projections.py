@@ -0,0 +1,110 @@
+from .models import Post, Category
+from .thumbnails import thumbnail_srcset
+
+# Columns read by the post list projection, instead of full Post, Category
+# and PostAnalytics instances
+POST_LIST_COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'thumbnail',
+    'thumbnail_variants',
+    'slug',
+    'reading_time',
+    'category__id',
+    'category__name',
+    'category__title',
+    'category__description',
+    'category__thumbnail',
+    'category__thumbnail_variants',
+    'category__slug',
+    'category__parent_id',
+    'post_analytics__views',
+)
+
+POST_THUMBNAIL_STORAGE = Post._meta.get_field('thumbnail').storage
+CATEGORY_THUMBNAIL_STORAGE = Category._meta.get_field('thumbnail').storage
+
+
+def file_url(storage, name):
+    # What DRF's ImageField renders without a request in context
+    return storage.url(name) if name else None
+
+
+def project_post_list(queryset, ordering=()):
+    """
+    Restricts `queryset` to the post list columns plus the `ordering` fields
+    keyset pagination needs; rows come back as dicts.
+    """
+    extra = [field.lstrip('-') for field in ordering if field.lstrip('-') not in POST_LIST_COLUMNS]
+    return queryset.values(*POST_LIST_COLUMNS, *extra)
+
+
+class PostListRow:
+    """
+    A flat post list record built from one projected row. `to_dict()` has
+    the exact keys, order and values of `PostListSerializer`.
+    """
+
+    __slots__ = (
+        'id',
+        'title',
+        'description',
+        'thumbnail',
+        'thumbnail_variants',
+        'slug',
+        'reading_time',
+        'category_id',
+        'category_name',
+        'category_title',
+        'category_description',
+        'category_thumbnail',
+        'category_thumbnail_variants',
+        'category_slug',
+        'category_parent_id',
+        'view_count',
+    )
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.title = row['title']
+        self.description = row['description']
+        self.thumbnail = row['thumbnail']
+        self.thumbnail_variants = row['thumbnail_variants']
+        self.slug = row['slug']
+        self.reading_time = row['reading_time']
+        self.category_id = row['category__id']
+        self.category_name = row['category__name']
+        self.category_title = row['category__title']
+        self.category_description = row['category__description']
+        self.category_thumbnail = row['category__thumbnail']
+        self.category_thumbnail_variants = row['category__thumbnail_variants']
+        self.category_slug = row['category__slug']
+        self.category_parent_id = row['category__parent_id']
+        self.view_count = row['post_analytics__views'] or 0
+
+    def to_dict(self):
+        return {
+            'id': str(self.id),
+            'title': self.title,
+            'description': self.description,
+            'thumbnail': file_url(POST_THUMBNAIL_STORAGE, self.thumbnail),
+            'thumbnail_srcset': thumbnail_srcset(POST_THUMBNAIL_STORAGE, self.thumbnail_variants),
+            'slug': self.slug,
+            'reading_time': self.reading_time,
+            'category': {
+                'id': str(self.category_id),
+                'name': self.category_name,
+                'title': self.category_title,
+                'description': self.category_description,
+                'thumbnail': file_url(CATEGORY_THUMBNAIL_STORAGE, self.category_thumbnail),
+                'thumbnail_srcset': thumbnail_srcset(CATEGORY_THUMBNAIL_STORAGE, self.category_thumbnail_variants),
+                'slug': self.category_slug,
+                'parent': str(self.category_parent_id) if self.category_parent_id else None,
+            },
+            'view_count': self.view_count,
+        }
+
+
+def render_post_list(rows):
+    return [PostListRow(row).to_dict() for row in rows]
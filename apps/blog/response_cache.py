@@ -0,0 +1,94 @@
+import gzip
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_api.serializers import APIResponseSerializer
+
+from . import counters
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Cached responses hold the rendered JSON plus compressed variants, so a hit
+# is served straight from bytes with no ORM, serializer or renderer work.
+RESPONSE_CACHE_STATS_KEY = 'blog:response_cache:stats'
+COMPRESS_MIN_BYTES = 512
+
+
+def envelope(results):
+    return APIResponseSerializer({'success': True, 'status': status.HTTP_200_OK, 'results': results}).data
+
+
+def render_entry(data, **extra):
+    body = JSONRenderer().render(data)
+    entry = {'body': body, **extra}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        entry['gzip'] = gzip.compress(body, mtime=0)
+        if brotli is not None:
+            entry['br'] = brotli.compress(body)
+    return entry
+
+
+def store_entry(cache_key, data, timeout, pipe=None, **extra):
+    """
+    Renders `data` and caches it with its compressed variants; `extra` is
+    stored alongside for callers that need more than the bytes.
+    """
+    entry = render_entry(data, **extra)
+    cache.set(cache_key, entry, timeout=timeout)
+    record_stats(
+        pipe,
+        stored=1,
+        stored_bytes=len(entry['body']),
+        stored_gzip_bytes=len(entry.get('gzip', entry['body'])),
+    )
+    return entry
+
+
+def accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return {token.split(';')[0].strip() for token in header.split(',')}
+
+
+def entry_response(request, entry, pipe=None):
+    encodings = accepted_encodings(request)
+    encoding = next((encoding for encoding in ('br', 'gzip') if encoding in entry and encoding in encodings), None)
+    body = entry[encoding] if encoding else entry['body']
+
+    response = HttpResponse(body, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ['Accept-Encoding'])
+
+    record_stats(pipe, served=1, served_bytes=len(body))
+    return response
+
+
+def record_stats(pipe=None, **deltas):
+    # Views pass the pipeline their impressions or views already go out on,
+    # so the stats add no round trip of their own
+    execute = pipe is None
+    if execute:
+        pipe = counters.redis_client.pipeline(transaction=False)
+
+    for field, amount in deltas.items():
+        pipe.hincrby(RESPONSE_CACHE_STATS_KEY, field, amount)
+
+    if execute:
+        pipe.execute()
+
+
+def response_cache_stats():
+    stats = {field.decode('utf-8'): int(value) for field, value in counters.redis_client.hgetall(RESPONSE_CACHE_STATS_KEY).items()}
+    if stats.get('stored_bytes'):
+        stats['gzip_ratio'] = round(stats.get('stored_gzip_bytes', 0) / stats['stored_bytes'], 3)
+    return stats
+
+
+def reset_response_cache_stats():
+    counters.redis_client.delete(RESPONSE_CACHE_STATS_KEY)
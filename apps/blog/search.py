@@ -0,0 +1,61 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'english'
+
+SEARCHABLE_POST_FIELDS = ('title', 'description', 'content', 'keywords')
+
+
+_trigram_support = {}
+
+
+def full_text_search_enabled(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def trigram_search_enabled(using='default'):
+    if not full_text_search_enabled(using):
+        return False
+
+    if using not in _trigram_support:
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_support[using] = cursor.fetchone() is not None
+    return _trigram_support[using]
+
+
+def post_search_vector():
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('keywords', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('content', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_post_search_vector(posts):
+    if not full_text_search_enabled(posts.db):
+        return 0
+    return posts.update(search_vector=post_search_vector())
+
+
+def search_posts(posts, search):
+    """
+    Filters `posts` by `search`. On PostgreSQL this uses the stored, GIN-indexed
+    `search_vector` and annotates a `rank`; elsewhere (SQLite test runs) it falls
+    back to `icontains` over the same fields and no rank is annotated.
+    """
+    if not full_text_search_enabled(posts.db):
+        query = Q()
+        for field in SEARCHABLE_POST_FIELDS:
+            query |= Q(**{f'{field}__icontains': search})
+        return posts.filter(query)
+
+    query = SearchQuery(search, search_type='websearch', config=SEARCH_CONFIG)
+    # ts_rank is a float4, whose text form does not round-trip through a
+    # Python float; as a float8 a keyset cursor can match it exactly
+    return posts.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
@@ -0,0 +1,68 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils.text import slugify
+from faker import Faker
+
+from .content import render_content
+from .toc import build_table_of_contents
+
+# Synthetic corpus generation for the seed_blog command. Nothing here
+# touches the database, so worker processes only need the settings.
+SEED_HEADING_LEVELS = (2, 2, 2, 3, 3, 4)
+SEED_HISTORY = timedelta(days=730)
+
+
+def zipf_counts(total, size, exponent, rng):
+    """
+    Splits about `total` across `size` items following Zipf's law: the item
+    of rank r gets a share proportional to 1 / r ** exponent. The counts
+    are returned in random order.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+    scale = total / sum(weights) if weights else 0
+    counts = [int(weight * scale) for weight in weights]
+    rng.shuffle(counts)
+    return counts
+
+
+def fake_content(fake, rng, max_headings):
+    parts = [f'<p>{paragraph}</p>' for paragraph in fake.paragraphs(nb=rng.randint(1, 3))]
+    for _ in range(rng.randint(0, max_headings)):
+        level = rng.choice(SEED_HEADING_LEVELS)
+        parts.append(f'<h{level}>{fake.sentence(nb_words=4).rstrip(".")}</h{level}>')
+        parts.extend(f'<p>{paragraph}</p>' for paragraph in fake.paragraphs(nb=rng.randint(1, 4)))
+    return ''.join(parts)
+
+
+def generate_posts(job):
+    """
+    Builds `count` post rows with Faker, including everything `Post.save`
+    would derive from the content, since bulk inserts skip it.
+    """
+    seed, count, max_headings, published_ratio = job
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    now = datetime.now(dt_timezone.utc)
+
+    posts = []
+    for _ in range(count):
+        post_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        title = fake.sentence(nb_words=rng.randint(4, 9)).rstrip('.')
+        content, toc = build_table_of_contents(fake_content(fake, rng, max_headings))
+        created_at = now - SEED_HISTORY * rng.random()
+        posts.append({
+            'id': post_id,
+            'title': title[:128],
+            'description': fake.sentence(nb_words=14)[:256],
+            'content': content,
+            'toc': toc,
+            'keywords': ', '.join(fake.words(nb=5))[:128],
+            'slug': f'{slugify(title)[:110]}-{post_id.hex[:8]}',
+            'status': 'published' if rng.random() < published_ratio else 'draft',
+            'created_at': created_at,
+            **render_content(content),
+        })
+    return posts
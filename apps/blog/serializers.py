@@ -1,12 +1,30 @@
 from rest_framework import serializers
 
 from .models import Post, Category, Heading, PostView
+from .events import EVENT_TYPES, EVENT_TARGETS
+from .thumbnails import thumbnail_srcset
 
 
-class CategorySerializer(serializers.ModelSerializer):    
+class ThumbnailSrcsetMixin(serializers.Serializer):
+    thumbnail_srcset = serializers.SerializerMethodField()
+
+    def get_thumbnail_srcset(self, obj):
+        return thumbnail_srcset(obj.thumbnail.storage, obj.thumbnail_variants)
+
+
+class CategorySerializer(ThumbnailSrcsetMixin, serializers.ModelSerializer):    
     class Meta:
         model = Category
-        fields = '__all__'
+        fields = [
+            'id',
+            'name',
+            'title',
+            'description',
+            'thumbnail',
+            'thumbnail_srcset',
+            'slug',
+            'parent',
+        ]
 
 
 class CategoryListSerializer(serializers.ModelSerializer):        
@@ -35,20 +53,40 @@ class PostViewSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PostSerializer(serializers.ModelSerializer):    
+class PostSerializer(ThumbnailSrcsetMixin, serializers.ModelSerializer):    
     category = CategorySerializer() 
-    headings = HeadingSerializer(many=True) 
+    headings = serializers.JSONField(source='toc', read_only=True)
+    # The sanitized rendering is served in place of the raw editor HTML
+    content = serializers.CharField(source='content_html', read_only=True)
     view_count = serializers.SerializerMethodField()
+    breadcrumbs = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = '__all__'
+        exclude = ['search_vector', 'toc', 'content_html', 'thumbnail_variants']
+
+    def __init__(self, *args, include_headings=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not include_headings:
+            self.fields.pop('headings')
 
     def get_view_count(self, obj):
         return obj.post_analytics.views if obj.post_analytics else 0
+
+    def get_breadcrumbs(self, obj):
+        # Root first, ending with the post's own category; a top level
+        # category is its own breadcrumb, which needs no query, and the
+        # detail view annotates nested ones on PostgreSQL
+        breadcrumbs = getattr(obj, 'category_breadcrumbs', None)
+        if breadcrumbs is not None:
+            return breadcrumbs
+        category = obj.category
+        if category.parent_id is None:
+            return [{'name': category.name, 'slug': category.slug}]
+        return list(category.get_ancestors().values('name', 'slug'))
     
 
-class PostListSerializer(serializers.ModelSerializer):    
+class PostListSerializer(ThumbnailSrcsetMixin, serializers.ModelSerializer):    
     category = CategorySerializer() 
     view_count = serializers.SerializerMethodField()
     
@@ -59,10 +97,27 @@ class PostListSerializer(serializers.ModelSerializer):
             'title',
             'description',
             'thumbnail',
+            'thumbnail_srcset',
             'slug',
+            'reading_time',
             'category',
             'view_count'
         ]
 
     def get_view_count(self, obj):
-        return obj.post_analytics.views if obj.post_analytics else 0
\ No newline at end of file
+        return obj.post_analytics.views if obj.post_analytics else 0
+
+
+class AnalyticsEventSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=EVENT_TYPES)
+    target = serializers.ChoiceField(choices=EVENT_TARGETS)
+    id = serializers.UUIDField(required=False)
+    slug = serializers.CharField(required=False, max_length=128)
+    duration = serializers.FloatField(required=False, min_value=0, max_value=60 * 60 * 4)
+
+    def validate(self, data):
+        if ('id' in data) == ('slug' in data):
+            raise serializers.ValidationError('Provide either an id or a slug.')
+        if data['type'] == 'dwell' and 'duration' not in data:
+            raise serializers.ValidationError('Dwell events require a duration.')
+        return data
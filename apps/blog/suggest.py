@@ -0,0 +1,123 @@
+import bisect
+import threading
+from urllib.parse import quote
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Value, When
+
+from .caching import SUGGEST_NAMESPACE, get_version
+from .models import Post, Category
+from .search import trigram_search_enabled
+
+SUGGEST_CACHE_TIMEOUT = 60 * 5
+
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted in-memory index of every word-start suffix of a set of labels,
+    e.g. "Scaling Django" is reachable from "scal..." and from "djan...".
+    Lookups are a bisect plus a short scan.
+    """
+
+    def __init__(self, entries):
+        keys = []
+        for label, slug in entries:
+            words = normalize_query(label).split(' ')
+            for position in range(len(words)):
+                keys.append((' '.join(words[position:]), position, label, slug))
+        keys.sort()
+        self.keys = keys
+        self.sort_keys = [key[0] for key in keys]
+
+    def lookup(self, prefix, limit):
+        start = bisect.bisect_left(self.sort_keys, prefix)
+        matches = {}
+        for key, position, label, slug in self.keys[start:]:
+            if not key.startswith(prefix):
+                break
+            best = matches.get(slug)
+            if best is None or position < best[0]:
+                matches[slug] = (position, len(label), label)
+
+        # Prefer labels that start with the query, then shorter labels
+        ranked = sorted(matches.items(), key=lambda item: item[1][:2])
+        return [(label, slug) for slug, (_, _, label) in ranked[:limit]]
+
+
+class SuggestionIndex:
+    """
+    Per-process prefix indexes of published post titles and category names,
+    rebuilt when the `suggest` cache version is bumped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.posts = None
+        self.categories = None
+
+    def get(self):
+        version = get_version(SUGGEST_NAMESPACE)
+        if self.version != version:
+            with self._lock:
+                if self.version != version:
+                    self.posts = PrefixIndex(Post.postobjects.values_list('title', 'slug'))
+                    self.categories = PrefixIndex(Category.objects.values_list('name', 'slug'))
+                    self.version = version
+        return self.posts, self.categories
+
+
+suggestion_index = SuggestionIndex()
+
+
+def suggest_from_index(query, limit):
+    posts, categories = suggestion_index.get()
+    return {
+        'posts': [{'title': title, 'slug': slug} for title, slug in posts.lookup(query, limit)],
+        'categories': [{'name': name, 'slug': slug} for name, slug in categories.lookup(query, limit)],
+    }
+
+
+def prefix_match(field, query):
+    return Case(When(**{f'{field}__istartswith': query}, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+def suggest_from_trigram(query, limit):
+    # Only `%>` filters: the gin_trgm_ops indexes serve it, while istartswith
+    # compiles to UPPER(...) LIKE, which they cannot. Prefix matches still
+    # rank first, checked on the matched rows only.
+    posts = Post.postobjects.filter(title__trigram_word_similar=query).annotate(
+        prefix=prefix_match('title', query),
+        similarity=TrigramWordSimilarity(query, 'title'),
+    ).order_by('-prefix', '-similarity', 'title').values('title', 'slug')[:limit]
+
+    categories = Category.objects.filter(name__trigram_word_similar=query).annotate(
+        prefix=prefix_match('name', query),
+        similarity=TrigramWordSimilarity(query, 'name'),
+    ).order_by('-prefix', '-similarity', 'name').values('name', 'slug')[:limit]
+
+    return {
+        'posts': list(posts),
+        'categories': list(categories),
+    }
+
+
+def get_suggestions(query, limit=5):
+    query = normalize_query(query)
+    if not query:
+        return {'posts': [], 'categories': []}
+
+    if not trigram_search_enabled():
+        return suggest_from_index(query, limit)
+
+    cache_key = f'suggest:{get_version(SUGGEST_NAMESPACE)}:{limit}:{quote(query)}'
+    suggestions = cache.get(cache_key)
+    if suggestions is None:
+        suggestions = suggest_from_trigram(query, limit)
+        cache.set(cache_key, suggestions, timeout=SUGGEST_CACHE_TIMEOUT)
+    return suggestions
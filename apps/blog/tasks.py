@@ -1,14 +1,63 @@
 from celery import shared_task
 
 import logging
-import redis
+import posixpath
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta, timezone as dt_timezone
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, Value, F, IntegerField, FloatField, Count, Sum, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, TruncDay
+from django.utils import timezone
 
-from .models import PostAnalytics, Post, CategoryAnalytics, Category
+from .models import (
+    PostAnalytics,
+    Post,
+    Category,
+    CategoryAnalytics,
+    PostAnalyticsRollup,
+    CategoryAnalyticsRollup,
+    exact_unique_views,
+)
+from . import counters
+from .trending import bump_trending
+from .thumbnails import variants_are_current, render_variants, delete_variants, variant_names, walk_files
+from .counters import (
+    COUNTER_METRICS,
+    ROLLUP_METRICS,
+    counter_bucket_keys,
+    bucket_start,
+    drain_hash,
+    drain_legacy_impressions,
+    add_counts,
+    drain_dwell_times,
+    add_dwell_totals,
+    pop_unique_viewers_dirty,
+    mark_unique_viewers_dirty,
+    count_unique_viewers,
+)
 
 logger = logging.getLogger(__name__)
 
-redis_client = redis.StrictRedis(host=settings.REDIS_HOST, port=6379, db=0)
+ANALYTICS_MODELS = {
+    model.counter_kind: model for model in (PostAnalytics, CategoryAnalytics)
+}
+ROLLUP_MODELS = {
+    model.counter_kind: model for model in (PostAnalyticsRollup, CategoryAnalyticsRollup)
+}
+
+
+def analytics_target(kind):
+    analytics_model = ANALYTICS_MODELS[kind]
+    model = analytics_model._meta.get_field(analytics_model.target_field).related_model
+    return model, analytics_model, f'{analytics_model.target_field}_id'
+
+FLUSH_BATCH_SIZE = 500
+FLUSH_INTERVAL = 60
+MIN_FLUSH_INTERVAL = 5
+FLUSH_SCHEDULED_KEY = 'counters:flush:scheduled'
+HOURLY_ROLLUP_RETENTION = timedelta(days=getattr(settings, 'BLOG_HOURLY_ROLLUP_RETENTION_DAYS', 30))
 
 
 @shared_task
@@ -23,70 +72,369 @@ def increment_post_impressions(post_id):
 @shared_task
 def increment_post_views_tasks(slug, ip_address):
     try:
-        post = Post.objects.get(slug=slug)
-        post_analytics, created = PostAnalytics.objects.get_or_create(post=post)
-        post_analytics.increment_view(ip_address)
+        post = Post.objects.only('id', 'category_id').get(slug=slug)
+        PostAnalytics.record_view(post.id, ip_address)
+        bump_trending([(post.id, post.category_id, 'view')])
     except Exception as e:
         logger.info(f'Error incrementing views for Post slug {slug}: {str(e)}')
 
 
-@shared_task
-def sync_impressions_to_db():
-    keys = redis_client.keys('post:impressions:*')
-    for key in keys:
+def valid_ids(ids):
+    valid = []
+    for object_id in ids:
         try:
-            post_id = key.decode('utf-8').split(":")[-1]
+            valid.append(str(uuid.UUID(object_id)))
+        except ValueError:
+            logger.info(f'Skipping counters for invalid ID {object_id}.')
+    return valid
 
-            try:
-                post = Post.objects.get(id=post_id)
-            except Post.DoesNotExist:
-                logger.info(f"Post with ID {post_id} does not exist. Skipping.")
-                continue
 
-            impressions = int(redis_client.get(key))
-            if impressions == 0:
-                redis_client.delete(key)
-                continue
+def ensure_analytics_rows(kind, ids):
+    model, analytics_model, fk_name = analytics_target(kind)
+
+    existing = set(
+        str(object_id) for object_id in analytics_model.objects.filter(
+            **{f'{fk_name}__in': ids}
+        ).values_list(fk_name, flat=True)
+    )
+    missing = [object_id for object_id in ids if object_id not in existing]
+    if missing:
+        live = model.objects.filter(id__in=missing).values_list('id', flat=True)
+        analytics_model.objects.bulk_create(
+            [analytics_model(**{fk_name: object_id}) for object_id in live],
+            ignore_conflicts=True,
+        )
+
+
+def per_row_value(fk_name, values, default=0):
+    return Case(
+        *[When(**{fk_name: object_id}, then=Value(value)) for object_id, value in values.items()],
+        default=Value(default),
+        output_field=IntegerField(),
+    )
+
+
+def running_average(fk_name, dwell_times):
+    # new mean = (mean * samples + sum) / (samples + n), evaluated against the old row values
+    return Case(
+        *[
+            When(**{fk_name: object_id}, then=(
+                (F('avg_time_on_page') * F('time_on_page_samples') + Value(milliseconds / 1000))
+                / (F('time_on_page_samples') + Value(samples))
+            ))
+            for object_id, (milliseconds, samples) in dwell_times.items()
+        ],
+        default=F('avg_time_on_page'),
+        output_field=FloatField(),
+    )
+
+
+def apply_counter_deltas(kind, deltas, dwell_times=None):
+    """
+    Adds `deltas` ({metric: {object id: n}}) to the analytics rows of `kind`
+    and folds `dwell_times` ({object id: (milliseconds, samples)}) into their
+    running average, with one UPDATE per batch; the click-through rate is a
+    generated column.
+    """
+    _, analytics_model, fk_name = analytics_target(kind)
+    dwell_times = dwell_times or {}
+
+    ids = valid_ids(set(dwell_times).union(*deltas.values()))
+    for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+        batch = ids[start:start + FLUSH_BATCH_SIZE]
+        ensure_analytics_rows(kind, batch)
+
+        updates = {}
+        for metric, counts in deltas.items():
+            batch_counts = {object_id: counts[object_id] for object_id in batch if object_id in counts}
+            if batch_counts:
+                updates[metric] = F(metric) + per_row_value(fk_name, batch_counts)
+
+        batch_dwell_times = {object_id: dwell_times[object_id] for object_id in batch if object_id in dwell_times}
+        if batch_dwell_times:
+            updates['avg_time_on_page'] = running_average(fk_name, batch_dwell_times)
+            updates['time_on_page_samples'] = F('time_on_page_samples') + per_row_value(
+                fk_name, {object_id: samples for object_id, (_, samples) in batch_dwell_times.items()}
+            )
+
+        analytics_model.objects.filter(**{f'{fk_name}__in': batch}).update(**updates)
+
 
-            analytics, _ = PostAnalytics.objects.get_or_create(post=post)
-            analytics.impressions += impressions
-            analytics.save()
+def apply_rollup_deltas(kind, hourly):
+    """
+    Adds `hourly` ({hour start: {metric: {object id: n}}}) to the hourly
+    rollup rows of `kind`, with one UPDATE per hour and batch.
+    """
+    model, _, fk_name = analytics_target(kind)
+    rollup_model = ROLLUP_MODELS[kind]
 
-            analytics._update_click_through_rate()
+    for hour, deltas in hourly.items():
+        ids = valid_ids(set().union(*deltas.values()))
+        for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+            batch = ids[start:start + FLUSH_BATCH_SIZE]
 
-            redis_client.delete(key)
+            live = model.objects.filter(id__in=batch).values_list('id', flat=True)
+            rollup_model.objects.bulk_create(
+                [rollup_model(**{fk_name: object_id, 'granularity': 'hour', 'start': hour}) for object_id in live],
+                ignore_conflicts=True,
+            )
 
+            updates = {}
+            for metric, counts in deltas.items():
+                batch_counts = {object_id: counts[object_id] for object_id in batch if object_id in counts}
+                if batch_counts:
+                    updates[metric] = F(metric) + per_row_value(fk_name, batch_counts)
+
+            rollup_model.objects.filter(
+                **{f'{fk_name}__in': batch}, granularity='hour', start=hour
+            ).update(**updates)
+
+
+def drain_counters(kind):
+    """
+    Drains every counter bucket of `kind` into {(metric, bucket): {object id: n}}.
+    """
+    drained = {}
+    for metric in ROLLUP_METRICS:
+        for key in counter_bucket_keys(metric, kind):
+            counts = {object_id: count for object_id, count in drain_hash(key).items() if count > 0}
+            if counts:
+                drained[(metric, int(key.decode('utf-8').rsplit(':', 1)[1]))] = counts
+    return drained
+
+
+def flush_counters(kind):
+    drain_legacy_impressions(kind)
+    drained = drain_counters(kind)
+    dwell_times = drain_dwell_times(kind)
+
+    deltas = defaultdict(Counter)
+    hourly = defaultdict(lambda: defaultdict(Counter))
+    for (metric, bucket), counts in drained.items():
+        if metric in COUNTER_METRICS:
+            deltas[metric].update(counts)
+        hourly[bucket_start(bucket)][metric].update(counts)
+
+    if drained or dwell_times:
+        try:
+            with transaction.atomic():
+                apply_counter_deltas(kind, deltas, dwell_times)
+                apply_rollup_deltas(kind, hourly)
         except Exception as e:
-            logger.info(f'Error syncing impressions for {key}: {str(e)}')
+            # Put the drained counts back into their buckets so the next flush retries them
+            for (metric, bucket), counts in drained.items():
+                add_counts(metric, kind, counts, bucket=bucket)
+            add_dwell_totals(kind, dwell_times)
+            logger.info(f'Error flushing {kind} counters: {str(e)}')
+            raise
+    return len(set(dwell_times).union(*drained.values()))
+
+
+def next_flush_delay(pending):
+    # One batch per run keeps the default pace; a larger backlog shortens the interval
+    if pending <= FLUSH_BATCH_SIZE:
+        return FLUSH_INTERVAL
+    return max(MIN_FLUSH_INTERVAL, FLUSH_INTERVAL * FLUSH_BATCH_SIZE // pending)
+
+
+@shared_task
+def flush_analytics_counters():
+    pending = flush_counters('post') + flush_counters('category')
+
+    delay = next_flush_delay(pending)
+    if delay < FLUSH_INTERVAL and counters.redis_client.set(FLUSH_SCHEDULED_KEY, 1, nx=True, ex=delay):
+        flush_analytics_counters.apply_async(countdown=delay)
+    return pending
+
+
+@shared_task
+def sync_impressions_to_db():
+    return flush_counters('post')
 
 
 @shared_task
 def sync_category_impressions_to_db():
-    keys = redis_client.keys('category:impressions:*')
-    for key in keys:
+    return flush_counters('category')
+
+
+def sync_post_popularity(post_ids):
+    Post.objects.filter(id__in=post_ids).update(popularity=Coalesce(
+        Subquery(PostAnalytics.objects.filter(post=OuterRef('pk')).values('views')[:1]),
+        Value(0),
+    ))
+
+
+def materialize_unique_views(kind):
+    """
+    Writes the unique viewer count of every object that had new viewers into
+    its analytics row. Estimates never lower a count (rows may predate the
+    HyperLogLogs); exact mode counts the view rows instead.
+    """
+    _, analytics_model, fk_name = analytics_target(kind)
+    materialized = 0
+
+    while True:
+        ids = valid_ids(pop_unique_viewers_dirty(kind, FLUSH_BATCH_SIZE))
+        if not ids:
+            return materialized
+
         try:
-            category_id = key.decode('utf-8').split(":")[-1]
+            with transaction.atomic():
+                ensure_analytics_rows(kind, ids)
+                rows = analytics_model.objects.filter(**{f'{fk_name}__in': ids})
 
-            try:
-                category = Category.objects.get(id=category_id)
-            except Category.DoesNotExist:
-                logger.info(f"Category with ID {category_id} does not exist. Skipping.")
-                continue
+                if exact_unique_views():
+                    counts = {
+                        str(object_id): viewers for object_id, viewers in
+                        analytics_model.view_model.objects.filter(**{f'{fk_name}__in': ids})
+                        .values_list(fk_name)
+                        .annotate(viewers=Count('id'))
+                    }
+                    rows.update(views=per_row_value(fk_name, {object_id: counts.get(object_id, 0) for object_id in ids}))
+                else:
+                    counts = count_unique_viewers(kind, ids)
+                    rows.update(views=Greatest(F('views'), per_row_value(fk_name, counts)))
+
+                if kind == 'post':
+                    sync_post_popularity(ids)
+        except Exception as e:
+            mark_unique_viewers_dirty(kind, ids)
+            logger.info(f'Error materializing {kind} unique views: {str(e)}')
+            raise
+
+        materialized += len(ids)
+
+
+@shared_task
+def sync_unique_views():
+    return materialize_unique_views('post') + materialize_unique_views('category')
+
+
+def compact_rollups(kind, now=None):
+    """
+    Folds the hourly rollups of every full day older than the retention
+    window into daily rollups and deletes them.
+    """
+    rollup_model = ROLLUP_MODELS[kind]
+    fk_name = f'{rollup_model.target_field}_id'
+
+    cutoff = ((now or timezone.now()) - HOURLY_ROLLUP_RETENTION).astimezone(dt_timezone.utc)
+    cutoff = cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with transaction.atomic():
+        hourly = rollup_model.objects.filter(granularity='hour', start__lt=cutoff)
+        totals = {
+            (str(row[fk_name]), row['day']): row for row in
+            hourly.annotate(day=TruncDay('start', tzinfo=dt_timezone.utc))
+            .values(fk_name, 'day')
+            .annotate(
+                total_views=Sum('views'),
+                total_impressions=Sum('impressions'),
+                total_clicks=Sum('clicks'),
+            )
+        }
+        if not totals:
+            return 0
+
+        existing = {
+            (str(getattr(row, fk_name)), row.start): row for row in rollup_model.objects.filter(
+                **{f'{fk_name}__in': {object_id for object_id, _ in totals}},
+                granularity='day',
+                start__in={day for _, day in totals},
+            )
+        }
+
+        daily = []
+        for (object_id, day), row in totals.items():
+            previous = existing.get((object_id, day))
+            daily.append(rollup_model(**{
+                fk_name: object_id,
+                'granularity': 'day',
+                'start': day,
+                **{
+                    metric: row[f'total_{metric}'] + (getattr(previous, metric) if previous else 0)
+                    for metric in ROLLUP_METRICS
+                },
+            }))
+
+        rollup_model.objects.bulk_create(
+            daily,
+            update_conflicts=True,
+            unique_fields=[rollup_model.target_field, 'granularity', 'start'],
+            update_fields=list(ROLLUP_METRICS),
+        )
+        hourly.delete()
 
-            impressions = int(redis_client.get(key) or 0)
+    return len(daily)
 
-            if impressions == 0:
-                redis_client.delete(key)
+
+@shared_task
+def compact_analytics_rollups():
+    return compact_rollups('post') + compact_rollups('category')
+
+
+THUMBNAIL_MODELS = {'post': Post, 'category': Category}
+# Files younger than this may belong to an upload or variant render whose
+# transaction has not committed yet, so the sweep leaves them alone
+THUMBNAIL_SWEEP_MIN_AGE = timedelta(hours=getattr(settings, 'BLOG_THUMBNAIL_SWEEP_MIN_AGE_HOURS', 24))
+
+
+def refresh_thumbnail_variants(kind, object_id, force=False):
+    """
+    Regenerates the thumbnail variants of one post or category unless they
+    already match its current upload, and removes the stale ones. Returns
+    whether anything was written.
+    """
+    instance = THUMBNAIL_MODELS[kind].objects.filter(pk=object_id).first()
+    if instance is None or (variants_are_current(instance) and not force):
+        return False
+
+    previous = instance.thumbnail_variants
+    instance.thumbnail_variants = render_variants(instance.thumbnail) if instance.thumbnail else {}
+    # Saving (rather than updating) also invalidates the cached responses
+    instance.save(update_fields=['thumbnail_variants'])
+    delete_variants(instance.thumbnail.storage, previous, keep=instance.thumbnail_variants)
+    return True
+
+
+@shared_task
+def generate_thumbnail_variants(kind, object_id):
+    try:
+        refresh_thumbnail_variants(kind, object_id)
+    except Exception as e:
+        logger.info(f'Error generating thumbnail variants for {kind} {object_id}: {str(e)}')
+
+
+def sweep_thumbnails(min_age=THUMBNAIL_SWEEP_MIN_AGE, dry_run=False, now=None):
+    """
+    Removes files under the thumbnail upload directories that no post or
+    category references as its thumbnail or one of its variants. Content
+    addressed storage never deletes on its own, since records may share a
+    file, so replaced uploads are only reclaimed here. Returns the names
+    removed (or that would be, with `dry_run`).
+    """
+    cutoff = (now or timezone.now()) - min_age
+    referenced, directories = set(), {}
+    for model in THUMBNAIL_MODELS.values():
+        field = model._meta.get_field('thumbnail')
+        directories[posixpath.dirname(field.generate_filename(None, 'name'))] = field.storage
+        for thumbnail, variants in model.objects.values_list('thumbnail', 'thumbnail_variants').iterator():
+            if thumbnail:
+                referenced.add(thumbnail)
+            referenced |= variant_names(variants)
+
+    removed = []
+    for directory, storage in directories.items():
+        delete = getattr(storage, 'purge', storage.delete)
+        for name in walk_files(storage, directory):
+            if name in referenced or storage.get_modified_time(name) > cutoff:
                 continue
-                
-            analytics, _ = CategoryAnalytics.objects.get_or_create(category=category)
-            
-            analytics.impressions += impressions
-            analytics.save()
-            
-            analytics._update_click_through_rate()
-            
-            redis_client.delete(key)
-                
-        except Exception as e:
-            logger.info(f'Error syncing impressions for {key}: {str(e)}')
\ No newline at end of file
+            if not dry_run:
+                delete(name)
+            removed.append(name)
+    return removed
+
+
+@shared_task
+def sweep_orphaned_thumbnails():
+    return len(sweep_thumbnails())
@@ -1,11 +1,58 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
+from django.test import override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.text import slugify
+from datetime import datetime, timedelta, timezone as dt_timezone
 from rest_framework.test import APIClient
-from unittest.mock import patch
+from rest_framework.renderers import JSONRenderer
+from PIL import Image
+from unittest import skipUnless
+from unittest.mock import ANY, patch
+from importlib import import_module
+import gzip
+
+from core.storage_backends import is_content_addressed
+from core.views import IMMUTABLE_CACHE_CONTROL, serve_media
 
-from .models import Category, Post, PostAnalytics, Heading
+from .caching import CATEGORIES_NAMESPACE, get_versions, post_namespace
+from .models import CATEGORY_MAX_DEPTH, Category, CategoryAnalytics, Post, PostAnalytics, PostAnalyticsRollup, PostView, Heading
+from .search import full_text_search_enabled, search_posts, trigram_search_enabled
+from .serializers import PostListSerializer
+from .pagination import KeysetPagination
+from .projections import project_post_list, render_post_list
+from .response_cache import RESPONSE_CACHE_STATS_KEY
+from .views import post_detail_cache_key
+from .seeding import zipf_counts
+from .thumbnails import variant_names
+from .trending import TRENDING_EPOCH_SECONDS, TRENDING_HALF_LIFE, bump_trending
+from .tasks import (
+    flush_counters,
+    compact_rollups,
+    materialize_unique_views,
+    next_flush_delay,
+    sweep_thumbnails,
+    generate_thumbnail_variants,
+    refresh_thumbnail_variants,
+    FLUSH_BATCH_SIZE,
+    FLUSH_INTERVAL,
+    MIN_FLUSH_INTERVAL,
+)
 
 # -------------- MODELS TESTS --------------
 
@@ -27,6 +74,123 @@ class CategoryModelTest(TestCase):
         self.assertEqual(str(self.category.title), 'Technology')
 
 
+class CategoryTreeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.tech = Category.objects.create(name='Tech', slug='tech')
+        self.python = Category.objects.create(name='Python', slug='python', parent=self.tech)
+        self.django = Category.objects.create(name='Django', slug='django', parent=self.python)
+        self.life = Category.objects.create(name='Life', slug='life')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_path_and_depth_follow_parents(self):
+        self.assertEqual(self.tech.path, f'{self.tech.id.hex}/')
+        self.assertEqual(self.django.path, f'{self.tech.id.hex}/{self.python.id.hex}/{self.django.id.hex}/')
+        self.assertEqual(self.django.depth, 2)
+        self.assertEqual(list(self.django.get_ancestors()), [self.tech, self.python, self.django])
+        self.assertEqual(set(self.tech.get_descendants(include_self=False)), {self.python, self.django})
+
+    def test_moving_a_category_reroots_its_descendants(self):
+        self.python.parent = self.life
+        self.python.save()
+
+        self.django.refresh_from_db()
+        self.assertEqual(self.django.path, f'{self.life.id.hex}/{self.python.id.hex}/{self.django.id.hex}/')
+        self.assertEqual(self.django.depth, 2)
+        self.assertEqual(list(self.tech.get_descendants(include_self=False)), [])
+
+    def test_cycles_are_rejected(self):
+        self.tech.parent = self.django
+        with self.assertRaises(ValidationError) as raised:
+            self.tech.full_clean()
+        self.assertIn('parent', raised.exception.message_dict)
+        with self.assertRaises(ValidationError):
+            self.tech.save()
+
+        self.tech.parent = self.tech
+        with self.assertRaises(ValidationError):
+            self.tech.full_clean()
+
+    def test_nesting_is_limited_by_the_path_length(self):
+        deepest = self.django
+        for level in range(CATEGORY_MAX_DEPTH - 3):
+            deepest = Category.objects.create(name=f'Level {level}', slug=f'level-{level}', parent=deepest)
+        self.assertEqual(deepest.depth, CATEGORY_MAX_DEPTH - 1)
+
+        too_deep = Category(name='Too deep', slug='too-deep', parent=deepest)
+        with self.assertRaises(ValidationError) as raised:
+            too_deep.full_clean()
+        self.assertIn('parent', raised.exception.message_dict)
+
+        # moving a subtree counts its deepest descendant, not just itself
+        self.life.parent = Category.objects.create(name='Home', slug='home')
+        self.life.save()
+        self.python.parent = self.life
+        with self.assertRaises(ValidationError):
+            self.python.full_clean()
+        with self.assertRaises(ValidationError):
+            self.python.save()
+        self.python.refresh_from_db()
+        self.assertEqual(self.python.parent, self.tech)
+
+    def test_category_posts_can_include_subcategories(self):
+        for category in (self.tech, self.django):
+            Post.objects.create(
+                title=f'{category.name} post',
+                description='A test post',
+                content='Content',
+                slug=f'{category.slug}-post',
+                category=category,
+                status='published',
+            )
+
+        def listed(**params):
+            response = self.client.get(reverse('category-posts'), {'slug': 'tech', **params}, HTTP_API_KEY=self.api_key)
+            return {post['slug'] for post in response.json()['results']}
+
+        self.assertEqual(listed(), {'tech-post'})
+        self.assertEqual(listed(subcategories='true'), {'tech-post', 'django-post'})
+
+    @patch('apps.blog.counters.redis_client')
+    def test_post_detail_has_breadcrumbs(self, mock_redis):
+        Post.objects.create(
+            title='Django post',
+            description='A test post',
+            content='Content',
+            slug='django-post',
+            category=self.django,
+            status='published',
+        )
+        response = self.client.get(reverse('posts-detail'), {'slug': 'django-post'}, HTTP_API_KEY=self.api_key)
+
+        breadcrumbs = [crumb['slug'] for crumb in response.json()['results']['breadcrumbs']]
+        self.assertEqual(breadcrumbs, ['tech', 'python', 'django'])
+
+    @patch('apps.blog.counters.redis_client')
+    def test_category_list_sorts_by_views(self, mock_redis):
+        CategoryAnalytics.objects.filter(category=self.life).update(views=5)
+        CategoryAnalytics.objects.filter(category=self.tech).update(views=2)
+
+        response = self.client.get(reverse('category-list'), {'sorting': 'most_viewed'}, HTTP_API_KEY=self.api_key)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([category['slug'] for category in response.json()['results']], ['life', 'tech'])
+
+    def test_tree_is_built_from_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('category-tree'), HTTP_API_KEY=self.api_key)
+
+        tree = response.json()['results']
+        self.assertEqual([node['slug'] for node in tree], ['life', 'tech'])
+        self.assertEqual(tree[1]['children'][0]['slug'], 'python')
+        self.assertEqual(tree[1]['children'][0]['children'][0]['slug'], 'django')
+
+
 class PostModelTest(TestCase):
     def setUp(self):
         cache.clear()
@@ -79,7 +243,7 @@ class PostAnalyticsModelTest(TestCase):
             status='published',
         )
 
-        self.analytics = PostAnalytics.objects.create(post=self.post)
+        self.analytics = PostAnalytics.objects.get(post=self.post)
 
     def tearDown(self):
         cache.clear()
@@ -90,6 +254,35 @@ class PostAnalyticsModelTest(TestCase):
         self.analytics.refresh_from_db()
         self.assertEqual(self.analytics.click_through_rate, 100.0)
 
+    def test_increments_do_not_lose_updates(self):
+        stale = PostAnalytics.objects.get(pk=self.analytics.pk)
+
+        with self.assertNumQueries(2):
+            self.analytics.increment_click()
+        stale.increment_click()
+
+        self.assertEqual(stale.clicks, 2)
+        self.analytics.refresh_from_db()
+        self.assertEqual(self.analytics.clicks, 2)
+
+    def test_click_through_rate_is_computed_by_the_database(self):
+        PostAnalytics.increment(self.post.id, impressions=4, clicks=1)
+
+        self.analytics.refresh_from_db()
+        self.assertEqual(self.analytics.click_through_rate, 25.0)
+        self.assertEqual(
+            PostAnalytics.objects.filter(click_through_rate__gt=20).get().pk,
+            self.analytics.pk,
+        )
+
+    def test_category_analytics_share_the_counters(self):
+        analytics = CategoryAnalytics.objects.get(category=self.category)
+        analytics.increment_impressions()
+        analytics.increment_click()
+
+        self.assertEqual((analytics.impressions, analytics.clicks), (1, 1))
+        self.assertEqual(analytics.click_through_rate, 100.0)
+
 
 class HeadingModelTest(TestCase):
     def setUp(self):
@@ -126,6 +319,322 @@ class HeadingModelTest(TestCase):
         self.assertEqual(self.heading.level, 1)
 
 
+class TableOfContentsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Tech', slug='tech')
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content=(
+                '<h2>Getting <em>started</em></h2><p>Text</p>'
+                '<h3 class="note">Setup</h3><h3>Setup</h3>'
+                '<h2 id="custom">Wrap &amp; up</h2><h4>&nbsp;</h4>'
+            ),
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_save_injects_anchors_and_stores_toc(self):
+        self.assertEqual(
+            [(entry['title'], entry['slug'], entry['level']) for entry in self.post.toc],
+            [('Getting started', 'getting-started', 2), ('Setup', 'setup', 3), ('Setup', 'setup-2', 3), ('Wrap & up', 'custom', 2)],
+        )
+        self.assertIn('<h2 id="getting-started">Getting <em>started</em></h2>', self.post.content)
+        self.assertIn('<h3 id="setup" class="note">Setup</h3>', self.post.content)
+        self.assertIn('<h4>&nbsp;</h4>', self.post.content)
+
+        headings = list(self.post.headings.values_list('slug', 'order'))
+        self.assertEqual(headings, [('getting-started', 0), ('setup', 1), ('setup-2', 2), ('custom', 3)])
+
+    def test_heading_rows_are_diffed_on_content_change(self):
+        first = self.post.headings.get(order=0)
+
+        self.post.content = '<h2>Getting started</h2><h2>Next steps</h2>'
+        self.post.save()
+
+        self.assertEqual(list(self.post.headings.values_list('title', flat=True)), ['Getting started', 'Next steps'])
+        # unchanged headings keep their rows
+        self.assertEqual(self.post.headings.get(order=0).pk, first.pk)
+
+    def test_saves_that_skip_content_leave_headings_alone(self):
+        Post.objects.filter(pk=self.post.pk).update(content='<h2>Changed elsewhere</h2>')
+        self.post.popularity = 5
+        self.post.save(update_fields=['popularity'])
+
+        self.assertEqual(self.post.headings.count(), 4)
+
+    def test_migrated_manual_headings_survive_the_next_save(self):
+        Post.objects.filter(pk=self.post.pk).update(content='<p>No headings here</p>', toc=[])
+        self.post.headings.all().delete()
+        Heading.objects.create(post=self.post, title='Intro & scope', slug='intro', level=2, order=0)
+        Heading.objects.create(post=self.post, title='Details', slug='details', level=3, order=4)
+
+        migration = import_module('apps.blog.migrations.0021_post_table_of_contents')
+        # Data migrations only read the connection off the schema editor
+        migration.build_tables_of_contents(apps, connection.schema_editor())
+
+        self.post.refresh_from_db()
+        self.assertEqual(
+            self.post.content,
+            '<h2 id="intro">Intro &amp; scope</h2><h3 id="details">Details</h3><p>No headings here</p>',
+        )
+        self.assertEqual([entry['slug'] for entry in self.post.toc], ['intro', 'details'])
+
+        self.post.save()
+
+        self.assertEqual(
+            list(self.post.headings.values_list('title', 'slug', 'level', 'order')),
+            [('Intro & scope', 'intro', 2, 0), ('Details', 'details', 3, 1)],
+        )
+
+
+class ContentDerivativesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Tech', slug='tech')
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content=(
+                '<h2 onclick="steal()">Intro</h2>'
+                '<p>Hello <a href="javascript:alert(1)">there</a> and <a href="https://example.com">here</a>.</p>'
+                '<script>alert("x")</script><p>Unclosed <strong>bold'
+            ),
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_content_is_sanitized_on_save(self):
+        self.assertEqual(
+            self.post.content_html,
+            '<h2 id="intro">Intro</h2>'
+            '<p>Hello <a>there</a> and <a href="https://example.com">here</a>.</p>'
+            '<p>Unclosed <strong>bold</strong></p>',
+        )
+
+    def test_excerpt_word_count_and_reading_time(self):
+        self.assertEqual(self.post.excerpt, 'Intro Hello there and here. Unclosed bold')
+        self.assertEqual(self.post.word_count, 7)
+        self.assertEqual(self.post.reading_time, 1)
+
+        self.post.content = '<p>' + ' '.join(['word'] * 401) + '</p>'
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.word_count, 401)
+        self.assertEqual(self.post.reading_time, 3)
+        self.assertTrue(self.post.excerpt.endswith('…'))
+        self.assertLessEqual(len(self.post.excerpt), 300)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_detail_serves_sanitized_content(self, mock_redis):
+        client = APIClient()
+        response = client.get(reverse('posts-detail'), {'slug': 'post-1'}, HTTP_API_KEY=settings.VALID_API_KEYS[0])
+
+        post = response.json()['results']
+        self.assertEqual(post['content'], self.post.content_html)
+        self.assertEqual(post['reading_time'], 1)
+        self.assertNotIn('content_html', post)
+
+
+def image_upload(name, size, mode='RGBA'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ThumbnailVariantsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        # Run the variants task inline instead of sending it to the broker,
+        # letting its errors fail the test
+        delay = patch.object(generate_thumbnail_variants, 'delay', side_effect=refresh_thumbnail_variants)
+        delay.start()
+        self.addCleanup(delay.stop)
+
+        self.category = Category.objects.create(name='Tech', slug='tech')
+
+    def tearDown(self):
+        cache.clear()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_post(self, thumbnail):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title='Post 1',
+                description='A test post',
+                content='Content',
+                thumbnail=thumbnail,
+                keywords='test',
+                slug='post-1',
+                category=self.category,
+                status='published',
+            )
+
+    def test_upload_generates_width_variants(self):
+        post = self.create_post(image_upload('hero.png', (1500, 900)))
+        post.refresh_from_db()
+
+        variants = post.thumbnail_variants
+        self.assertEqual((variants['source'], variants['width'], variants['height']), (post.thumbnail.name, 1500, 900))
+        self.assertIn('jpeg', variants['formats'])
+        self.assertIn('webp', variants['formats'])
+        for sizes in variants['formats'].values():
+            self.assertEqual([(size['width'], size['height']) for size in sizes], [(320, 192), (640, 384), (1024, 614)])
+            for size in sizes:
+                self.assertTrue(post.thumbnail.storage.exists(size['name']))
+
+    def test_small_images_are_not_upscaled(self):
+        post = self.create_post(image_upload('icon.png', (200, 100), mode='P'))
+        post.refresh_from_db()
+
+        self.assertEqual([size['width'] for size in post.thumbnail_variants['formats']['jpeg']], [200])
+
+    @override_settings(STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_replacing_the_upload_deletes_old_variants(self):
+        post = self.create_post(image_upload('hero.png', (800, 600)))
+        post.refresh_from_db()
+        old_names = [size['name'] for sizes in post.thumbnail_variants['formats'].values() for size in sizes]
+
+        post.thumbnail = image_upload('other.png', (800, 600))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        post.refresh_from_db()
+
+        self.assertTrue(post.thumbnail_variants['source'].endswith('other.png'))
+        self.assertFalse(any(post.thumbnail.storage.exists(name) for name in old_names))
+
+    def test_sweep_reclaims_replaced_content_addressed_uploads(self):
+        post = self.create_post(image_upload('hero.png', (800, 600)))
+        post.refresh_from_db()
+        storage = post.thumbnail.storage
+        self.assertTrue(is_content_addressed(post.thumbnail.name))
+        old_names = [post.thumbnail.name, *variant_names(post.thumbnail_variants)]
+        # category thumbnails live in their own directory and stay referenced
+        shared = Category.objects.create(name='Life', slug='life', thumbnail=image_upload('logo.png', (10, 10)))
+
+        post.thumbnail = image_upload('other.png', (900, 600))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        post.refresh_from_db()
+        current_names = [post.thumbnail.name, *variant_names(post.thumbnail_variants)]
+
+        # shared files are never deleted on replacement, and fresh ones are
+        # left to uploads that may still be committing
+        self.assertTrue(all(storage.exists(name) for name in old_names))
+        self.assertEqual(sweep_thumbnails(), [])
+
+        removed = sweep_thumbnails(min_age=timedelta(0), dry_run=True)
+        self.assertEqual(sorted(removed), sorted(old_names))
+        self.assertTrue(all(storage.exists(name) for name in old_names))
+
+        out = io.StringIO()
+        call_command('sweep_thumbnails', min_age_hours=0, stdout=out)
+        self.assertIn(f'Deleted {len(old_names)} unreferenced thumbnail files.', out.getvalue())
+        self.assertFalse(any(storage.exists(name) for name in old_names))
+        self.assertTrue(all(storage.exists(name) for name in current_names))
+        self.assertTrue(storage.exists(shared.thumbnail.name))
+
+    @patch('apps.blog.counters.redis_client')
+    def test_serializers_expose_srcset(self, mock_redis):
+        self.create_post(image_upload('hero.png', (800, 600)))
+        client = APIClient()
+        api_key = settings.VALID_API_KEYS[0]
+
+        listed = client.get(reverse('posts-list'), HTTP_API_KEY=api_key).json()['results'][0]
+        srcset = listed['thumbnail_srcset']['webp'].split(', ')
+        self.assertEqual([candidate.split(' ')[1] for candidate in srcset], ['320w', '640w'])
+        self.assertEqual(listed['category']['thumbnail_srcset'], {})
+
+        detail = client.get(reverse('posts-detail'), {'slug': 'post-1'}, HTTP_API_KEY=api_key).json()['results']
+        self.assertEqual(detail['thumbnail_srcset'], listed['thumbnail_srcset'])
+        self.assertNotIn('thumbnail_variants', detail)
+
+
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def tearDown(self):
+        cache.clear()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_identical_uploads_share_one_hash_named_file(self):
+        first = Category.objects.create(name='Tech', slug='tech', thumbnail=image_upload('logo.png', (10, 10)))
+        second = Category.objects.create(name='Life', slug='life', thumbnail=image_upload('other.png', (10, 10)))
+
+        self.assertEqual(first.thumbnail.name, second.thumbnail.name)
+        self.assertTrue(is_content_addressed(first.thumbnail.name))
+        self.assertTrue(first.thumbnail.name.startswith('thumbnails/blog_categories/'))
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'thumbnails', 'blog_categories'))), 1)
+
+        # deleting one reference keeps the shared file
+        first.thumbnail.storage.delete(first.thumbnail.name)
+        self.assertTrue(second.thumbnail.storage.exists(second.thumbnail.name))
+
+    def test_hash_named_media_is_served_immutable(self):
+        category = Category.objects.create(name='Tech', slug='tech', thumbnail=image_upload('logo.png', (10, 10)))
+        factory = RequestFactory()
+
+        response = serve_media(factory.get('/media/'), category.thumbnail.name, document_root=self.media_root)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+        with open(os.path.join(self.media_root, 'legacy.png'), 'wb') as legacy:
+            legacy.write(b'png')
+        response = serve_media(factory.get('/media/'), 'legacy.png', document_root=self.media_root)
+        self.assertNotIn('Cache-Control', response)
+
+
+class SeedBlogCommandTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_zipf_counts_are_heavy_tailed(self):
+        counts = sorted(zipf_counts(10_000, 100, 1.1, random.Random(1)), reverse=True)
+
+        self.assertEqual(len(counts), 100)
+        self.assertLessEqual(sum(counts), 10_000)
+        self.assertGreater(counts[0], sum(counts[50:]))
+
+    @patch('apps.blog.counters.redis_client')
+    def test_seeds_a_consistent_corpus(self, mock_redis):
+        call_command('seed_blog', posts=30, categories=6, depth=2, batch_size=10, workers=1, seed=7, stdout=io.StringIO())
+
+        self.assertEqual(Category.objects.count(), 6)
+        self.assertEqual(CategoryAnalytics.objects.count(), 6)
+        self.assertFalse(Category.objects.filter(depth__gt=1).exists())
+        for category in Category.objects.all():
+            self.assertEqual(category.ancestor_ids()[-1], category.id)
+
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(PostAnalytics.objects.count(), 30)
+        self.assertEqual(Heading.objects.count(), sum(len(post.toc) for post in Post.objects.all()))
+        self.assertEqual(PostView.objects.count(), sum(Post.objects.values_list('popularity', flat=True)))
+        self.assertFalse(Post.objects.filter(reading_time=0).exists())
+
+
 # -------------- VIEWS TESTS --------------
 
 class PostListViewTest(TestCase):
@@ -176,4 +685,1326 @@ class PostListViewTest(TestCase):
 
         post_data = results[0]
         self.assertEqual(post_data['id'], str(self.post.id))
-        self.assertEqual(post_data['title'], str(self.post.title))
\ No newline at end of file
+        self.assertEqual(post_data['title'], str(self.post.title))
+
+class PostListProjectionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        parent = Category.objects.create(name='Tech', slug='tech')
+        self.category = Category.objects.create(
+            name='Python',
+            title='Python',
+            slug='python',
+            parent=parent,
+            thumbnail='thumbnails/blog_categories/python/logo.png',
+        )
+
+        for i in range(4):
+            Post.objects.create(
+                title=f'Post {i}',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=f'thumbnails/blog/post {i}/cover.png' if i % 2 else None,
+                keywords='test',
+                slug=f'post-{i}',
+                category=self.category if i % 2 else parent,
+                status='published',
+            )
+        PostAnalytics.objects.filter(post__slug='post-1').update(views=12)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_projection_matches_serializer_bytes(self):
+        posts = Post.postobjects.order_by('-created_at', '-id')
+        expected = JSONRenderer().render(PostListSerializer(posts, many=True).data)
+
+        with self.assertNumQueries(1):
+            rendered = JSONRenderer().render(render_post_list(project_post_list(posts)))
+        self.assertEqual(rendered, expected)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_list_queries_do_not_grow_with_page_size(self, mock_redis):
+        # exists, count, page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('posts-list'), {'page_size': 4}, HTTP_API_KEY=self.api_key)
+        self.assertEqual(len(response.json()['results']), 4)
+
+
+class PostListCursorPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            title='Technology',
+            slug='tech'
+        )
+
+        now = timezone.now()
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug=f'post-{i}',
+                category=self.category,
+                status='published',
+                created_at=now - timedelta(minutes=i),
+            )
+            for i in range(8)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_cursor_pages_cover_all_posts_in_order(self, mock_redis):
+        url = f"{reverse('posts-list')}?cursor=&page_size=3"
+        seen = []
+        pages = 0
+
+        while url:
+            response = self.client.get(url, HTTP_API_KEY=self.api_key)
+            data = response.json()
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', data)
+            seen.extend(post['slug'] for post in data['results'])
+            url = data['next']
+            pages += 1
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, [post.slug for post in self.posts])
+        pipe = mock_redis.pipeline.return_value
+        impressions = [call for call in pipe.hincrby.call_args_list if call.args[0].startswith('impressions:')]
+        self.assertEqual(len(impressions), len(self.posts))
+        self.assertEqual(pipe.execute.call_count, pages)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_previous_cursor_returns_previous_page(self, mock_redis):
+        url = f"{reverse('posts-list')}?cursor=&page_size=3&ordering=az"
+        first = self.client.get(url, HTTP_API_KEY=self.api_key).json()
+        self.assertIsNone(first['previous'])
+
+        second = self.client.get(first['next'], HTTP_API_KEY=self.api_key).json()
+        back = self.client.get(second['previous'], HTTP_API_KEY=self.api_key).json()
+
+        self.assertEqual(
+            [post['slug'] for post in back['results']],
+            [post['slug'] for post in first['results']],
+        )
+
+    @patch('apps.blog.counters.redis_client')
+    def test_most_viewed_pages_follow_popularity(self, mock_redis):
+        for views, post in zip([5, 40, 5, 0, 12, 40, 1, 3], self.posts):
+            Post.objects.filter(pk=post.pk).update(popularity=views)
+
+        url = f"{reverse('posts-list')}?cursor=&page_size=3&sorting=most_viewed"
+        seen = []
+        while url:
+            data = self.client.get(url, HTTP_API_KEY=self.api_key).json()
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+
+        expected = Post.postobjects.order_by('-popularity', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(post_id) for post_id in expected])
+
+    @patch('apps.blog.counters.redis_client')
+    def test_invalid_cursor(self, mock_redis):
+        response = self.client.get(
+            f"{reverse('posts-list')}?cursor=not-a-cursor",
+            HTTP_API_KEY=self.api_key
+        )
+        self.assertEqual(response.status_code, 404)
+
+        # well-formed cursors with values their columns cannot hold
+        paginator = KeysetPagination(['-created_at', '-id'])
+        for position in (['not-a-date', str(self.posts[0].id)], [{'a': 1}, 'not-a-uuid'], [None, None]):
+            response = self.client.get(
+                reverse('posts-list'), {'cursor': paginator.encode_cursor(position)}, HTTP_API_KEY=self.api_key
+            )
+            self.assertEqual(response.status_code, 404, position)
+
+    @skipUnless(connection.vendor == 'postgresql', 'search ranks need PostgreSQL')
+    @patch('apps.blog.counters.redis_client')
+    def test_search_pages_keep_posts_tied_on_rank(self, mock_redis):
+        # two groups of posts with equal ranks inside each group
+        for post in self.posts[::2]:
+            post.keywords = 'post post'
+            post.save()
+
+        url = f"{reverse('posts-list')}?cursor=&page_size=3&search=post"
+        seen = []
+        # bounded, since a cursor that cannot match its tie repeats pages forever
+        while url and len(seen) <= len(self.posts):
+            data = self.client.get(url, HTTP_API_KEY=self.api_key).json()
+            seen.extend(post['slug'] for post in data['results'])
+            url = data['next']
+
+        expected = search_posts(Post.postobjects.all(), 'post').order_by('-rank', '-id').values_list('slug', flat=True)
+        self.assertEqual(seen, list(expected))
+        self.assertEqual(len(set(seen)), len(self.posts))
+
+
+class PostSearchViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            title='Technology',
+            slug='tech'
+        )
+        self.other_category = Category.objects.create(
+            name='Food',
+            title='Food',
+            slug='food'
+        )
+
+        self.django_post = Post.objects.create(
+            title='Scaling Django',
+            description='Notes on databases',
+            content='<p>Indexes and query plans</p>',
+            thumbnail=None,
+            keywords='python',
+            slug='scaling-django',
+            category=self.category,
+            status='published',
+        )
+        self.pasta_post = Post.objects.create(
+            title='Fresh pasta',
+            description='Dinner ideas for django developers',
+            content='<p>Flour and eggs</p>',
+            thumbnail=None,
+            keywords='cooking',
+            slug='fresh-pasta',
+            category=self.other_category,
+            status='published',
+        )
+        self.draft_post = Post.objects.create(
+            title='Django drafts',
+            description='Unpublished',
+            content='<p>Work in progress</p>',
+            thumbnail=None,
+            keywords='python',
+            slug='django-drafts',
+            category=self.category,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_search_matches_published_posts(self, mock_redis):
+        response = self.client.get(
+            f"{reverse('posts-list')}?search=django",
+            HTTP_API_KEY=self.api_key
+        )
+        slugs = [post['slug'] for post in response.json()['results']]
+
+        self.assertCountEqual(slugs, ['scaling-django', 'fresh-pasta'])
+        if full_text_search_enabled():
+            # title matches carry a higher weight than description matches
+            self.assertEqual(slugs[0], 'scaling-django')
+
+    @patch('apps.blog.counters.redis_client')
+    def test_search_keeps_category_filter(self, mock_redis):
+        response = self.client.get(
+            f"{reverse('posts-list')}?search=django&category=food",
+            HTTP_API_KEY=self.api_key
+        )
+        slugs = [post['slug'] for post in response.json()['results']]
+
+        self.assertEqual(slugs, ['fresh-pasta'])
+
+    def test_search_vector_follows_content(self):
+        self.django_post.title = 'Scaling Flask'
+        self.django_post.save()
+
+        results = search_posts(Post.postobjects.all(), 'flask')
+        self.assertEqual(list(results), [self.django_post])
+
+
+class SearchSuggestViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Programming',
+            title='Programming',
+            slug='programming'
+        )
+
+        for title, status in (
+            ('Scaling Django', 'published'),
+            ('Django for beginners', 'published'),
+            ('Programming in Rust', 'published'),
+            ('Django internals', 'draft'),
+        ):
+            Post.objects.create(
+                title=title,
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug=slugify(title),
+                category=self.category,
+                status=status,
+            )
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_suggestions(self, query, **params):
+        response = self.client.get(
+            reverse('search-suggest'),
+            {'q': query, **params},
+            HTTP_API_KEY=self.api_key
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    @patch('apps.blog.counters.redis_client')
+    def test_prefix_matches_titles_and_categories(self, mock_redis):
+        results = self.get_suggestions('Djan')
+
+        self.assertEqual(
+            [post['slug'] for post in results['posts']],
+            ['django-for-beginners', 'scaling-django'],
+        )
+        self.assertEqual(results['categories'], [])
+        mock_redis.pipeline.assert_not_called()
+
+        results = self.get_suggestions('prog')
+        self.assertEqual(results['categories'], [{'name': 'Programming', 'slug': 'programming'}])
+        self.assertEqual([post['slug'] for post in results['posts']], ['programming-in-rust'])
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.get_suggestions('django', limit=1)['posts']), 1)
+        self.assertEqual(self.get_suggestions(' '), {'posts': [], 'categories': []})
+
+    def test_new_posts_are_suggested(self):
+        self.get_suggestions('djan')
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Django signals',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug='django-signals',
+                category=self.category,
+                status='published',
+            )
+
+        slugs = [post['slug'] for post in self.get_suggestions('djan')['posts']]
+        self.assertIn('django-signals', slugs)
+
+
+class PostDetailQueryBudgetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            slug='tech'
+        )
+
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content='<h2>Intro</h2><p>Content</p><h2>Setup</h2><p>More</p><h2>Wrap up</h2>',
+            thumbnail=None,
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_detail_with_headings_is_one_query(self, mock_redis):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts-detail'), {'slug': 'post-1'}, HTTP_API_KEY=self.api_key)
+
+        post = response.json()['results']
+        self.assertEqual([heading['slug'] for heading in post['headings']], ['intro', 'setup', 'wrap-up'])
+        self.assertEqual(post['category']['slug'], 'tech')
+        self.assertNotIn('search_vector', post)
+
+        # the headings endpoint reuses the cached detail
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('post-headings'), {'slug': 'post-1'}, HTTP_API_KEY=self.api_key)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_detail_without_headings_is_one_query(self, mock_redis):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('posts-detail'), {'slug': 'post-1', 'headings': 'false'}, HTTP_API_KEY=self.api_key
+            )
+        self.assertNotIn('headings', response.json()['results'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('post-headings'), {'slug': 'post-1'}, HTTP_API_KEY=self.api_key)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    @skipUnless(connection.vendor == 'postgresql', 'breadcrumbs are joined in on PostgreSQL')
+    @patch('apps.blog.counters.redis_client')
+    def test_detail_in_a_nested_category_is_one_query(self, mock_redis):
+        python = Category.objects.create(name='Python', slug='python', parent=self.category)
+        django = Category.objects.create(name='Django', slug='django', parent=python)
+        self.post.category = django
+        self.post.save()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts-detail'), {'slug': 'post-1'}, HTTP_API_KEY=self.api_key)
+
+        self.assertEqual(
+            response.json()['results']['breadcrumbs'],
+            [{'name': 'Tech', 'slug': 'tech'}, {'name': 'Python', 'slug': 'python'}, {'name': 'Django', 'slug': 'django'}],
+        )
+
+
+# Tables expected to grow without bound; reading one of them front to back
+# for a single request is a regression
+LARGE_TABLES = {
+    'blog_post', 'blog_heading', 'blog_postview', 'blog_postanalytics', 'blog_category',
+    'blog_categoryanalytics', 'blog_postanalyticsrollup', 'blog_categoryanalyticsrollup',
+}
+
+
+def sequential_scans(plan):
+    """
+    Yields the tables a JSON EXPLAIN plan reads with a sequential scan.
+    """
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from sequential_scans(child)
+
+
+def has_sort(plan):
+    return plan.get('Node Type') in ('Sort', 'Incremental Sort') or any(has_sort(child) for child in plan.get('Plans', []))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are checked on PostgreSQL')
+@patch('apps.blog.counters.redis_client')
+class QueryPlanTest(TestCase):
+    """
+    Runs EXPLAIN on every query a read endpoint issues. Sequential scans are
+    disabled first, so one that still shows up means no index can serve the
+    query, however small the test tables are.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(name='Tech', slug='tech')
+        self.subcategory = Category.objects.create(name='Django', slug='django', parent=self.category)
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content='Content for the post',
+            keywords='test',
+            slug='post-1',
+            category=self.subcategory,
+            status='published',
+        )
+        Heading.objects.create(post=self.post, title='Intro', level=2, order=0)
+
+    def tearDown(self):
+        cache.clear()
+
+    def assertNoSequentialScans(self, url_name, params=None, presorted=False):
+        """
+        With `presorted`, ordered queries must also read an index in order
+        rather than sort every matching row to return one page.
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name), params or {}, HTTP_API_KEY=self.api_key)
+        self.assertEqual(response.status_code, 200)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {query["sql"]}')
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                scanned = LARGE_TABLES.intersection(sequential_scans(plan[0]['Plan']))
+                self.assertFalse(scanned, f'{url_name} {params}: sequential scan on {scanned} for {query["sql"]}')
+                if presorted:
+                    self.assertFalse(has_sort(plan[0]['Plan']), f'{url_name} {params}: sort for {query["sql"]}')
+
+    def test_post_lists(self, *mocks):
+        self.assertNoSequentialScans('posts-list', presorted=True)
+        for sorting in ('newest', 'recently_updated', 'most_viewed'):
+            self.assertNoSequentialScans('posts-list', {'sorting': sorting}, presorted=True)
+            self.assertNoSequentialScans('posts-list', {'sorting': sorting, 'cursor': ''}, presorted=True)
+        self.assertNoSequentialScans('posts-list', {'category': 'django'})
+
+    def test_post_detail_and_headings(self, *mocks):
+        self.assertNoSequentialScans('posts-detail', {'slug': 'post-1'})
+        self.assertNoSequentialScans('post-headings', {'slug': 'post-1'})
+
+    def test_category_posts(self, *mocks):
+        self.assertNoSequentialScans('category-posts', {'slug': 'django'})
+        self.assertNoSequentialScans('category-posts', {'slug': 'tech', 'subcategories': 'true'})
+
+    def test_post_search_and_title_ordering(self, *mocks):
+        # ranks only exist for matching rows, so search results are sorted
+        self.assertNoSequentialScans('posts-list', {'search': 'post'})
+        self.assertNoSequentialScans('posts-list', {'search': 'post', 'cursor': ''})
+        self.assertNoSequentialScans('posts-list', {'search': 'post', 'category': 'django'})
+        for ordering in ('az', 'za'):
+            self.assertNoSequentialScans('posts-list', {'ordering': ordering}, presorted=True)
+            self.assertNoSequentialScans('posts-list', {'ordering': ordering, 'cursor': ''}, presorted=True)
+
+    def test_category_lists(self, *mocks):
+        self.assertNoSequentialScans('category-list')
+        self.assertNoSequentialScans('category-list', {'parent_slug': 'tech'})
+        for ordering in ('az', 'za'):
+            self.assertNoSequentialScans('category-list', {'ordering': ordering})
+
+    def test_trending(self, mock_redis):
+        mock_redis.pipeline.return_value.execute.return_value = [False, [str(self.post.id).encode()]]
+        self.assertNoSequentialScans('posts-trending')
+        self.assertNoSequentialScans('posts-trending', {'category': 'django'})
+
+    def test_analytics_history(self, mock_redis):
+        mock_redis.pfcount.return_value = 0
+        for granularity in ('hour', 'day'):
+            self.assertNoSequentialScans('analytics-history', {'post': 'post-1', 'granularity': granularity})
+            self.assertNoSequentialScans('analytics-history', {'category': 'tech', 'granularity': granularity})
+        self.assertNoSequentialScans('analytics-history', {'post': str(self.post.id)})
+
+    def test_search_suggest(self, *mocks):
+        if not trigram_search_enabled():
+            self.skipTest('suggestions only query the database with pg_trgm')
+        for query in ('p', 'po', 'post', 'post 1', 'djan'):
+            self.assertNoSequentialScans('search-suggest', {'q': query})
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        # Last-Modified comes from the version bumps, which wait for the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(
+                name='Tech',
+                slug='tech'
+            )
+
+            self.post = Post.objects.create(
+                title='Post 1',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug='post-1',
+                category=self.category,
+                status='published',
+            )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_post_detail_revalidates_without_queries(self, mock_redis):
+        url = f"{reverse('posts-detail')}?slug=post-1"
+        response = self.client.get(url, HTTP_API_KEY=self.api_key)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # with the cached bytes evicted the view is still recorded
+        cache.delete(post_detail_cache_key('post-1'))
+        mock_redis.reset_mock()
+        response = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        mock_redis.pipeline.return_value.pfadd.assert_any_call(f'uniques:post:{self.post.id}', '127.0.0.1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Post 1 (edited)'
+            self.post.save()
+
+        response = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_lists_answer_304_before_building_the_page(self, mock_redis):
+        page_prefixes = ('post_list:', 'category_list:', 'category_posts:')
+        for url in (
+            reverse('posts-list'),
+            reverse('category-list'),
+            f"{reverse('category-posts')}?slug=tech",
+        ):
+            response = self.client.get(url, HTTP_API_KEY=self.api_key)
+            self.assertEqual(response.status_code, 200)
+
+            etag = response['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            # with the cached page evicted it is rebuilt, so its impressions
+            # still count
+            mock_redis.reset_mock()
+            get = cache.get
+            evicted = lambda key, *args, **kwargs: None if key.startswith(page_prefixes) else get(key, *args, **kwargs)
+            with patch.object(cache, 'get', side_effect=evicted):
+                response = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+            hincrby = mock_redis.pipeline.return_value.hincrby
+            self.assertTrue(any('impressions' in call.args[0] for call in hincrby.call_args_list))
+
+    @patch('apps.blog.counters.redis_client')
+    def test_if_modified_since(self, mock_redis):
+        url = reverse('posts-list')
+        last_modified = self.client.get(url, HTTP_API_KEY=self.api_key)['Last-Modified']
+
+        response = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            slug='tech'
+        )
+
+        for i in range(6):
+            Post.objects.create(
+                title=f'Post {i}',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug=f'post-{i}',
+                category=self.category,
+                status='published',
+            )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_hits_serve_the_rendered_bytes(self, mock_redis):
+        url = reverse('posts-list')
+        miss = self.client.get(url, HTTP_API_KEY=self.api_key)
+
+        with self.assertNumQueries(0):
+            hit = self.client.get(url, HTTP_API_KEY=self.api_key)
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit['Content-Type'], 'application/json')
+        self.assertEqual(hit.json()['count'], 6)
+
+        compressed = self.client.get(url, HTTP_API_KEY=self.api_key, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), miss.content)
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+
+        stats = {}
+        for call in mock_redis.pipeline.return_value.hincrby.call_args_list:
+            if call.args[0] != RESPONSE_CACHE_STATS_KEY:
+                continue
+            stats[call.args[1]] = stats.get(call.args[1], 0) + call.args[2]
+        self.assertEqual(stats['stored'], 1)
+        self.assertEqual(stats['stored_bytes'], len(miss.content))
+        self.assertEqual(stats['served'], 3)
+        self.assertEqual(stats['served_bytes'], 2 * len(miss.content) + len(compressed.content))
+
+    @patch('apps.blog.counters.redis_client')
+    def test_equivalent_queries_share_one_entry(self, mock_redis):
+        Category.objects.create(name='Django', slug='django')
+        url = reverse('posts-list')
+        self.client.get(f'{url}?category=tech&category=django&page_size=6', HTTP_API_KEY=self.api_key)
+
+        for query in ('category=django&category=tech', 'category=tech&category=django&page_size=&p=1'):
+            with self.assertNumQueries(0):
+                response = self.client.get(f'{url}?{query}', HTTP_API_KEY=self.api_key)
+            self.assertEqual(response.json()['count'], 6)
+
+
+class CacheInvalidationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            title='Technology',
+            slug='tech'
+        )
+
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content='Content for the post',
+            thumbnail=None,
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_detail(self):
+        return self.client.get(
+            f"{reverse('posts-detail')}?slug=post-1",
+            HTTP_API_KEY=self.api_key
+        ).json()['results']
+
+    def get_category_posts(self):
+        return self.client.get(
+            f"{reverse('category-posts')}?slug=tech",
+            HTTP_API_KEY=self.api_key
+        ).json()['results']
+
+    def test_versions_are_bumped_once_the_transaction_commits(self):
+        namespaces = [post_namespace('post-1'), CATEGORIES_NAMESPACE]
+        versions = get_versions(*namespaces)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post.title = 'Post 1 (edited)'
+            self.post.save()
+            self.category.save()
+            # a reader before the commit still gets the old key
+            self.assertEqual(get_versions(*namespaces), versions)
+        self.assertTrue(callbacks)
+
+        for callback in callbacks:
+            callback()
+        self.assertTrue(all(new > old for new, old in zip(get_versions(*namespaces), versions)))
+
+    @patch('apps.blog.counters.redis_client')
+    def test_post_detail_refreshes_after_edit(self, mock_redis):
+        self.assertEqual(self.get_detail()['title'], 'Post 1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Post 1 (edited)'
+            self.post.save()
+
+        self.assertEqual(self.get_detail()['title'], 'Post 1 (edited)')
+
+    @patch('apps.blog.counters.redis_client')
+    def test_moving_a_post_refreshes_both_category_chains(self, mock_redis):
+        python = Category.objects.create(name='Python', slug='python', parent=self.category)
+        life = Category.objects.create(name='Life', slug='life')
+        notes = Category.objects.create(name='Notes', slug='notes', parent=life)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.category = python
+            self.post.save()
+
+        def listed(slug):
+            response = self.client.get(
+                reverse('category-posts'), {'slug': slug, 'subcategories': 'true'}, HTTP_API_KEY=self.api_key
+            )
+            # categories without posts answer 404
+            return [post['slug'] for post in response.json().get('results', [])]
+
+        self.assertEqual(listed('tech'), ['post-1'])
+        self.assertEqual(listed('life'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.category = notes
+            self.post.save()
+
+        self.assertEqual(listed('tech'), [])
+        self.assertEqual(listed('life'), ['post-1'])
+
+    @patch('apps.blog.counters.redis_client')
+    def test_post_detail_refreshes_after_heading_and_category_changes(self, mock_redis):
+        self.assertEqual(self.get_detail()['headings'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.content = '<h2>Intro</h2><p>Content for the post</p>'
+            self.post.save()
+        self.assertEqual([heading['slug'] for heading in self.get_detail()['headings']], ['intro'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.title = 'Technology & Science'
+            self.category.save()
+        self.assertEqual(self.get_detail()['category']['title'], 'Technology & Science')
+
+    @patch('apps.blog.counters.redis_client')
+    def test_category_posts_refresh_after_publish(self, mock_redis):
+        self.assertEqual(len(self.get_category_posts()), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Post 2',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug='post-2',
+                category=self.category,
+                status='published',
+            )
+
+        self.assertEqual(len(self.get_category_posts()), 2)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_moving_post_refreshes_old_category(self, mock_redis):
+        other = Category.objects.create(name='Other', slug='other')
+        Post.objects.create(
+            title='Post 2',
+            description='A test post',
+            content='Content for the post',
+            thumbnail=None,
+            keywords='test',
+            slug='post-2',
+            category=self.category,
+            status='published',
+        )
+        self.assertEqual(len(self.get_category_posts()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.category = other
+            self.post.save()
+
+        self.assertEqual([post['slug'] for post in self.get_category_posts()], ['post-2'])
+
+
+class ImpressionCountingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            title='Technology',
+            slug='tech'
+        )
+
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug=f'post-{i}',
+                category=self.category,
+                status='published',
+            )
+            for i in range(5)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_only_returned_page_is_counted_in_one_round_trip(self, mock_redis):
+        response = self.client.get(
+            f"{reverse('posts-list')}?page_size=2",
+            HTTP_API_KEY=self.api_key
+        )
+        data = response.json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(len(data['results']), 2)
+
+        pipe = mock_redis.pipeline.return_value
+        impressions = [call for call in pipe.hincrby.call_args_list if call.args[0] != RESPONSE_CACHE_STATS_KEY]
+        self.assertEqual([call.args[1] for call in impressions], [post['id'] for post in data['results']])
+        self.assertEqual(len({call.args[0] for call in impressions}), 1)
+        # the cache stats ride on the same round trip
+        pipe.execute.assert_called_once()
+
+        # A cache hit counts the same page again
+        self.client.get(f"{reverse('posts-list')}?page_size=2", HTTP_API_KEY=self.api_key)
+        impressions = [call for call in pipe.hincrby.call_args_list if call.args[0] != RESPONSE_CACHE_STATS_KEY]
+        self.assertEqual(len(impressions), 4)
+        self.assertEqual(pipe.execute.call_count, 2)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_flush_drains_buckets_into_one_bulk_update(self, mock_redis):
+        first, second = self.posts[0], self.posts[1]
+        PostAnalytics.objects.filter(post=second).delete()
+
+        buckets = {
+            'impressions:post:*': [b'impressions:post:1', b'impressions:post:2'],
+            'clicks:post:*': [b'clicks:post:2'],
+        }
+        mock_redis.scan_iter.side_effect = lambda match, count: buckets.get(match, [])
+        mock_redis.pipeline.return_value.execute.side_effect = [
+            [{str(first.id).encode(): b'3'}, 1],
+            [{str(first.id).encode(): b'5', str(second.id).encode(): b'4', b'not-a-uuid': b'1'}, 1],
+            [{str(first.id).encode(): b'2'}, 1],
+        ]
+
+        # savepoint, existing rows, live posts, insert missing row, update,
+        # then live posts, insert and update for the hourly rollup, release
+        with self.assertNumQueries(9):
+            self.assertEqual(flush_counters('post'), 3)
+
+        first_analytics = PostAnalytics.objects.get(post=first)
+        self.assertEqual(first_analytics.impressions, 8)
+        self.assertEqual(first_analytics.clicks, 2)
+        self.assertEqual(first_analytics.click_through_rate, 25.0)
+        self.assertEqual(PostAnalytics.objects.get(post=second).impressions, 4)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_flush_folds_dwell_times_into_running_average(self, mock_redis):
+        first, second = self.posts[0], self.posts[1]
+        PostAnalytics.objects.filter(post=first).update(avg_time_on_page=10, time_on_page_samples=2)
+        PostAnalytics.objects.filter(post=second).update(avg_time_on_page=30, time_on_page_samples=1)
+
+        buckets = {
+            'dwell:post:*': [b'dwell:post:1', b'dwell:post:2'],
+        }
+        mock_redis.scan_iter.side_effect = lambda match, count: buckets.get(match, [])
+        mock_redis.pipeline.return_value.execute.side_effect = [
+            [{f'{first.id}:ms'.encode(): b'15000', f'{first.id}:n'.encode(): b'1'}, 1],
+            [{f'{first.id}:ms'.encode(): b'25000', f'{first.id}:n'.encode(): b'1'}, 1],
+        ]
+
+        self.assertEqual(flush_counters('post'), 1)
+
+        first_analytics = PostAnalytics.objects.get(post=first)
+        self.assertAlmostEqual(first_analytics.avg_time_on_page, 15.0)
+        self.assertEqual(first_analytics.time_on_page_samples, 4)
+        # rows without new samples keep their average
+        self.assertEqual(PostAnalytics.objects.get(post=second).avg_time_on_page, 30)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_legacy_impression_keys_are_drained_once(self, mock_redis):
+        first, second = self.posts[0], self.posts[1]
+        legacy = [f'post:impressions:{first.id}'.encode(), f'post:impressions:{second.id}'.encode()]
+        mock_redis.exists.return_value = 0
+        mock_redis.scan_iter.side_effect = lambda match, count: legacy if match == 'post:impressions:*' else []
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [b'6', None]
+
+        flush_counters('post')
+
+        self.assertEqual([call.args[0] for call in pipe.getdel.call_args_list], legacy)
+        pipe.hincrby.assert_called_once_with(ANY, str(first.id), 6)
+        self.assertTrue(pipe.hincrby.call_args.args[0].startswith('impressions:post:'))
+        mock_redis.set.assert_not_called()
+
+        # once a scan finds no legacy keys the drain stops looking
+        legacy = []
+        flush_counters('post')
+        mock_redis.set.assert_called_once_with('counters:legacy_drained:post', 1)
+
+    def test_flush_delay_adapts_to_backlog(self):
+        self.assertEqual(next_flush_delay(10), FLUSH_INTERVAL)
+        self.assertLess(next_flush_delay(FLUSH_BATCH_SIZE * 4), FLUSH_INTERVAL)
+        self.assertEqual(next_flush_delay(FLUSH_BATCH_SIZE * 1000), MIN_FLUSH_INTERVAL)
+
+
+class UniqueViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(
+            name='Tech',
+            slug='tech'
+        )
+
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content='Content for the post',
+            thumbnail=None,
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_views_are_estimated_with_hyperloglog(self, mock_redis):
+        with self.assertNumQueries(0):
+            PostAnalytics.record_view(self.post.id, '10.0.0.1')
+
+        pipe = mock_redis.pipeline.return_value
+        self.assertEqual(pipe.pfadd.call_count, 2)
+        pipe.sadd.assert_called_once_with('uniques:dirty:post', str(self.post.id))
+
+        mock_redis.spop.side_effect = [[str(self.post.id).encode()], []]
+        pipe.execute.return_value = [42]
+        PostAnalytics.objects.filter(post=self.post).update(views=50)
+
+        self.assertEqual(materialize_unique_views('post'), 1)
+        # an estimate below the stored count does not lower it
+        self.assertEqual(PostAnalytics.objects.get(post=self.post).views, 50)
+
+        mock_redis.spop.side_effect = [[str(self.post.id).encode()], []]
+        pipe.execute.return_value = [75]
+        materialize_unique_views('post')
+        self.assertEqual(PostAnalytics.objects.get(post=self.post).views, 75)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).popularity, 75)
+
+    @override_settings(BLOG_EXACT_UNIQUE_VIEWS=True)
+    @patch('apps.blog.counters.redis_client')
+    def test_exact_mode_counts_one_row_per_ip(self, mock_redis):
+        for ip_address in ('10.0.0.1', '10.0.0.1', '10.0.0.2'):
+            PostAnalytics.record_view(self.post.id, ip_address)
+
+        self.assertEqual(PostView.objects.filter(post=self.post).count(), 2)
+        mock_redis.pipeline.return_value.pfadd.assert_not_called()
+
+        mock_redis.spop.side_effect = [[str(self.post.id).encode()], []]
+        materialize_unique_views('post')
+        self.assertEqual(PostAnalytics.objects.get(post=self.post).views, 2)
+
+
+class AnalyticsEventsViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            slug='tech'
+        )
+
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content='Content for the post',
+            thumbnail=None,
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_batch_is_recorded_in_one_transaction(self, mock_redis):
+        events = [
+            {'type': 'impression', 'target': 'post', 'slug': 'post-1'},
+            {'type': 'impression', 'target': 'post', 'id': str(self.post.id)},
+            {'type': 'click', 'target': 'post', 'slug': 'post-1'},
+            {'type': 'view', 'target': 'post', 'slug': 'post-1'},
+            {'type': 'dwell', 'target': 'post', 'slug': 'post-1', 'duration': 12.5},
+            {'type': 'click', 'target': 'category', 'slug': 'tech'},
+            {'type': 'click', 'target': 'post', 'slug': 'missing'},
+            {'type': 'dwell', 'target': 'post', 'slug': 'post-1'},
+            {'type': 'scroll', 'target': 'post', 'slug': 'post-1'},
+        ]
+
+        # one lookup per target type
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                reverse('analytics-events'), events, format='json', HTTP_API_KEY=self.api_key
+            )
+
+        self.assertEqual(response.status_code, 202)
+        results = response.json()['results']
+        self.assertEqual(results['accepted'], 6)
+        self.assertEqual([item['index'] for item in results['rejected']], [6, 7, 8])
+
+        # trending scores go out in their own pipeline after the transaction
+        self.assertEqual(
+            [call.kwargs for call in mock_redis.pipeline.call_args_list],
+            [{'transaction': True}, {'transaction': False}],
+        )
+        pipe = mock_redis.pipeline.return_value
+
+        increments = {
+            (call.args[0].rsplit(':', 1)[0], call.args[1]): call.args[2] for call in pipe.hincrby.call_args_list
+        }
+        self.assertEqual(increments[('impressions:post', str(self.post.id))], 2)
+        self.assertEqual(increments[('clicks:post', str(self.post.id))], 1)
+        self.assertEqual(increments[('clicks:category', str(self.category.id))], 1)
+        self.assertEqual(increments[('dwell:post', f'{self.post.id}:ms')], 12500)
+        self.assertEqual(increments[('dwell:post', f'{self.post.id}:n')], 1)
+        pipe.sadd.assert_called_once_with('uniques:dirty:post', str(self.post.id))
+
+    def test_batch_must_be_a_bounded_list(self):
+        response = self.client.post(
+            reverse('analytics-events'), {'type': 'click'}, format='json', HTTP_API_KEY=self.api_key
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_click_endpoints_buffer_into_the_counters(self, mock_redis):
+        CategoryAnalytics.objects.filter(category=self.category).update(clicks=4)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('increment-category-clicks'), {'slug': 'tech'}, format='json', HTTP_API_KEY=self.api_key
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results']['clicks'], 5)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('increment-post-clicks'), {'slug': 'post-1'}, format='json', HTTP_API_KEY=self.api_key
+            )
+        self.assertEqual(response.json()['results']['clicks'], 1)
+
+        increments = [
+            (call.args[0].rsplit(':', 1)[0], call.args[1], call.args[2])
+            for call in mock_redis.pipeline.return_value.hincrby.call_args_list
+        ]
+        self.assertEqual(increments, [
+            ('clicks:category', str(self.category.id), 1),
+            ('clicks:post', str(self.post.id), 1),
+        ])
+        # the rows only change when the counters are flushed
+        self.assertEqual(CategoryAnalytics.objects.get(category=self.category).clicks, 4)
+
+        response = self.client.post(
+            reverse('increment-post-clicks'), {'slug': 'missing'}, format='json', HTTP_API_KEY=self.api_key
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class AnalyticsRollupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            slug='tech'
+        )
+
+        self.post = Post.objects.create(
+            title='Post 1',
+            description='A test post',
+            content='Content for the post',
+            thumbnail=None,
+            keywords='test',
+            slug='post-1',
+            category=self.category,
+            status='published',
+        )
+
+        self.hour = datetime(2026, 1, 1, 10, tzinfo=dt_timezone.utc)
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_hourly(self, start, views=0, impressions=0, clicks=0):
+        return PostAnalyticsRollup.objects.create(
+            post=self.post, granularity='hour', start=start, views=views, impressions=impressions, clicks=clicks
+        )
+
+    @patch('apps.blog.counters.redis_client')
+    def test_flush_writes_hourly_buckets(self, mock_redis):
+        first = int(self.hour.timestamp()) // 60 + 5
+        second = first + 60
+        buckets = {
+            'views:post:*': [f'views:post:{first}'.encode()],
+            'impressions:post:*': [f'impressions:post:{first}'.encode(), f'impressions:post:{second}'.encode()],
+        }
+        mock_redis.scan_iter.side_effect = lambda match, count: buckets.get(match, [])
+        mock_redis.pipeline.return_value.execute.side_effect = [
+            [{str(self.post.id).encode(): b'2'}, 1],
+            [{str(self.post.id).encode(): b'7'}, 1],
+            [{str(self.post.id).encode(): b'3'}, 1],
+        ]
+
+        flush_counters('post')
+
+        rollups = PostAnalyticsRollup.objects.filter(post=self.post).order_by('start')
+        self.assertEqual(
+            [(row.start, row.views, row.impressions) for row in rollups],
+            [(self.hour, 2, 7), (self.hour + timedelta(hours=1), 0, 3)],
+        )
+        analytics = PostAnalytics.objects.get(post=self.post)
+        self.assertEqual(analytics.impressions, 10)
+        # lifetime views count unique viewers, not raw views
+        self.assertEqual(analytics.views, 0)
+
+    def test_compaction_folds_old_hours_into_days(self):
+        self.add_hourly(self.hour, views=1, impressions=4)
+        self.add_hourly(self.hour + timedelta(hours=3), views=2, clicks=1)
+        PostAnalyticsRollup.objects.create(
+            post=self.post, granularity='day', start=self.hour.replace(hour=0), views=5
+        )
+        recent = self.add_hourly(self.hour + timedelta(days=40), views=9)
+
+        self.assertEqual(compact_rollups('post', now=self.hour + timedelta(days=41)), 1)
+
+        day = PostAnalyticsRollup.objects.get(post=self.post, granularity='day')
+        self.assertEqual((day.start, day.views, day.impressions, day.clicks), (self.hour.replace(hour=0), 8, 4, 1))
+        self.assertEqual(list(PostAnalyticsRollup.objects.filter(granularity='hour')), [recent])
+
+    def test_range_query(self):
+        PostAnalyticsRollup.objects.create(
+            post=self.post, granularity='day', start=self.hour.replace(hour=0) - timedelta(days=1), views=5
+        )
+        self.add_hourly(self.hour, views=1, impressions=4)
+        self.add_hourly(self.hour + timedelta(hours=3), views=2, clicks=1)
+
+        params = {'post': 'post-1', 'from': '2025-12-31', 'to': '2026-01-02'}
+        response = self.client.get(reverse('analytics-history'), params, HTTP_API_KEY=self.api_key)
+        buckets = response.json()['results']['buckets']
+        self.assertEqual([bucket['views'] for bucket in buckets], [1, 2])
+        self.assertEqual(buckets[0]['start'], self.hour.isoformat())
+
+        response = self.client.get(
+            reverse('analytics-history'), {**params, 'granularity': 'day'}, HTTP_API_KEY=self.api_key
+        )
+        buckets = response.json()['results']['buckets']
+        self.assertEqual(
+            [(bucket['views'], bucket['impressions'], bucket['clicks']) for bucket in buckets],
+            [(5, 0, 0), (3, 4, 1)],
+        )
+
+        # a range starting mid-day still covers that day's compacted row
+        response = self.client.get(
+            reverse('analytics-history'),
+            {**params, 'from': '2025-12-31T15:30:00Z', 'granularity': 'day'},
+            HTTP_API_KEY=self.api_key,
+        )
+        results = response.json()['results']
+        self.assertEqual([bucket['views'] for bucket in results['buckets']], [5, 3])
+        self.assertEqual(results['from'], '2025-12-31T00:00:00+00:00')
+
+        # the daily viewer HyperLogLogs are long gone for this range
+        self.assertIsNone(response.json()['results']['unique_viewers'])
+
+        response = self.client.get(
+            reverse('analytics-history'), {'post': 'missing'}, HTTP_API_KEY=self.api_key
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_unique_viewers_over_recent_days(self, mock_redis):
+        mock_redis.pfcount.return_value = 7
+        now = timezone.now()
+
+        response = self.client.get(
+            reverse('analytics-history'),
+            {'post': 'post-1', 'from': (now - timedelta(days=2)).isoformat(), 'to': now.isoformat()},
+            HTTP_API_KEY=self.api_key,
+        )
+        self.assertEqual(response.json()['results']['unique_viewers'], 7)
+        # one daily HyperLogLog per day the range touches, counted as a union
+        keys = mock_redis.pfcount.call_args.args
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(keys[-1], f"uniques:post:{self.post.id}:{now.astimezone(dt_timezone.utc):%Y%m%d}")
+
+
+class TrendingPostsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        self.api_key = settings.VALID_API_KEYS[0]
+
+        self.category = Category.objects.create(
+            name='Tech',
+            slug='tech'
+        )
+
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}',
+                description='A test post',
+                content='Content for the post',
+                thumbnail=None,
+                keywords='test',
+                slug=f'post-{i}',
+                category=self.category,
+                status='published',
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch('apps.blog.counters.redis_client')
+    def test_scores_grow_with_time_instead_of_decaying(self, mock_redis):
+        epoch = 100
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [False, False]
+
+        post = self.posts[0]
+        bump_trending(
+            [(post.id, self.category.id, 'view'), (post.id, self.category.id, 'click')],
+            now=epoch * TRENDING_EPOCH_SECONDS + TRENDING_HALF_LIFE,
+        )
+
+        # one half-life into the epoch every event counts twice
+        self.assertEqual(
+            sorted((call.args[0], call.args[1]) for call in pipe.zincrby.call_args_list),
+            [(f'trending:category:{self.category.id}:{epoch}', 6.0), (f'trending:posts:{epoch}', 6.0)],
+        )
+        pipe.zunionstore.assert_not_called()
+
+        # the first write of an epoch seeds it from the previous one
+        pipe.execute.return_value = [True, False]
+        bump_trending([(post.id, self.category.id, 'view')], now=epoch * TRENDING_EPOCH_SECONDS)
+        pipe.zunionstore.assert_called_once()
+        key, weights = pipe.zunionstore.call_args.args
+        self.assertEqual(key, f'trending:posts:{epoch}')
+        self.assertEqual(weights[f'trending:posts:{epoch - 1}'], 2 ** -16)
+
+    @patch('apps.blog.counters.redis_client')
+    def test_top_posts_are_hydrated_from_cache(self, mock_redis):
+        ranked = [self.posts[2], self.posts[0]]
+        mock_redis.pipeline.return_value.execute.return_value = [False, [str(post.id).encode() for post in ranked]]
+
+        response = self.client.get(reverse('posts-trending'), HTTP_API_KEY=self.api_key)
+        self.assertEqual([post['slug'] for post in response.json()['results']], ['post-2', 'post-0'])
+
+        # cached items need no database query
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts-trending'), HTTP_API_KEY=self.api_key)
+        self.assertEqual([post['slug'] for post in response.json()['results']], ['post-2', 'post-0'])
@@ -0,0 +1,101 @@
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Uploaded thumbnails are resized into a fixed set of widths so clients can
+# pick one with srcset instead of downloading the original. AVIF is only
+# produced when Pillow has an encoder for it; JPEG is the fallback.
+THUMBNAIL_WIDTHS = getattr(settings, 'BLOG_THUMBNAIL_WIDTHS', (320, 640, 1024))
+THUMBNAIL_QUALITY = 80
+VARIANT_FORMATS = (('AVIF', 'avif'), ('WEBP', 'webp'), ('JPEG', 'jpg'))
+VARIANTS_DIRECTORY = 'variants'
+
+
+def variant_formats():
+    Image.init()
+    return [(format_name, extension) for format_name, extension in VARIANT_FORMATS if format_name in Image.SAVE]
+
+
+def variants_are_current(instance):
+    # Records without a thumbnail have no variants and nothing to generate
+    return instance.thumbnail_variants.get('source') == (instance.thumbnail.name or None)
+
+
+def encode(image, format_name):
+    if format_name == 'JPEG':
+        if image.mode != 'RGB':
+            # JPEG has no alpha channel, so transparency becomes white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format_name, quality=THUMBNAIL_QUALITY)
+    return buffer.getvalue()
+
+
+def render_variants(field_file):
+    """
+    Stores every width and format variant of an uploaded image next to it
+    and returns the record kept in `thumbnail_variants`: the source name and
+    size plus, per format, the name and size of each width. Images are never
+    upscaled; one narrower than every width gets a single variant.
+    """
+    with field_file.open('rb') as source, Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    directory, filename = posixpath.split(field_file.name)
+    stem = posixpath.splitext(filename)[0]
+    widths = [width for width in THUMBNAIL_WIDTHS if width < image.width] or [image.width]
+    formats = variant_formats()
+
+    variants = {'source': field_file.name, 'width': image.width, 'height': image.height, 'formats': {}}
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for format_name, extension in formats:
+            name = field_file.storage.save(
+                posixpath.join(directory, VARIANTS_DIRECTORY, f'{stem}-{width}w.{extension}'),
+                ContentFile(encode(resized, format_name)),
+            )
+            variants['formats'].setdefault(format_name.lower(), []).append(
+                {'name': name, 'width': width, 'height': height}
+            )
+    return variants
+
+
+def variant_names(variants):
+    return {size['name'] for sizes in variants.get('formats', {}).values() for size in sizes}
+
+
+def walk_files(storage, directory):
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk_files(storage, posixpath.join(directory, name))
+
+
+def delete_variants(storage, variants, keep=None):
+    # Storages that overwrite files may have reused names now in `keep`
+    for name in variant_names(variants) - variant_names(keep or {}):
+        storage.delete(name)
+
+
+def thumbnail_srcset(storage, variants):
+    """
+    Maps each variant format to a srcset attribute value.
+    """
+    return {
+        format_name: ', '.join(f"{storage.url(size['name'])} {size['width']}w" for size in sizes)
+        for format_name, sizes in variants.get('formats', {}).items()
+    }
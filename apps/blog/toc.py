@@ -0,0 +1,53 @@
+import re
+from html import unescape
+
+from django.utils.text import slugify
+
+# Post content is CKEditor HTML, so headings are matched as tags rather than
+# parsed into a tree; everything outside them is left byte for byte as is.
+HEADING_RE = re.compile(r'<h([1-6])(\s[^>]*)?>(.*?)</h\1\s*>', re.IGNORECASE | re.DOTALL)
+ID_ATTRIBUTE_RE = re.compile(r'\sid\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]*>')
+HEADING_MAX_LENGTH = 255
+
+
+def heading_text(markup):
+    return ' '.join(unescape(TAG_RE.sub('', markup)).split())
+
+
+def unique_slug(slug, used):
+    candidate, suffix = slug, 2
+    while candidate in used:
+        candidate = f'{slug}-{suffix}'
+        suffix += 1
+    return candidate
+
+
+def build_table_of_contents(content):
+    """
+    Gives every non-empty h1-h6 in `content` an anchor id (keeping ids that
+    are already there) and returns the rewritten content together with the
+    table of contents: one `title`, `slug`, `level`, `order` dict per
+    heading, in document order.
+    """
+    toc = []
+    used = set()
+
+    def anchor(match):
+        level, attributes, inner = int(match[1]), match[2] or '', match[3]
+        title = heading_text(inner)
+        if not title:
+            return match[0]
+
+        existing = ID_ATTRIBUTE_RE.search(attributes)
+        if existing:
+            slug = existing[2]
+        else:
+            slug = unique_slug(slugify(title)[:HEADING_MAX_LENGTH - 4] or 'section', used)
+            attributes = f' id="{slug}"{attributes}'
+        used.add(slug)
+
+        toc.append({'title': title[:HEADING_MAX_LENGTH], 'slug': slug[:HEADING_MAX_LENGTH], 'level': level, 'order': len(toc)})
+        return f'<h{level}{attributes}>{inner}</h{level}>'
+
+    return HEADING_RE.sub(anchor, content or ''), toc
@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+
+from . import counters
+
+# Trending scores use forward decay: an event at time t adds
+# weight * 2 ** ((t - epoch) / half_life), so older events weigh exponentially
+# less relative to new ones without ever rewriting existing scores. To keep
+# the multiplier bounded every epoch gets its own sorted set, seeded from the
+# previous one scaled down by the decay it accumulated.
+TRENDING_HALF_LIFE = getattr(settings, 'BLOG_TRENDING_HALF_LIFE', 60 * 60 * 6)
+TRENDING_EPOCH_HALF_LIVES = 16
+TRENDING_EPOCH_SECONDS = TRENDING_HALF_LIFE * TRENDING_EPOCH_HALF_LIVES
+TRENDING_KEY = 'trending:{scope}:{epoch}'
+TRENDING_SEEDED_KEY = 'trending:{scope}:{epoch}:seeded'
+TRENDING_WEIGHTS = {'view': 1.0, 'click': 2.0}
+SITE_SCOPE = 'posts'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def trending_epoch(now):
+    return int(now // TRENDING_EPOCH_SECONDS)
+
+
+def trending_key(scope, epoch):
+    return TRENDING_KEY.format(scope=scope, epoch=epoch)
+
+
+def queue_seed(pipe, scope, epoch):
+    # Only the first command of an epoch gets True back and seeds its set
+    pipe.set(TRENDING_SEEDED_KEY.format(scope=scope, epoch=epoch), 1, nx=True, ex=TRENDING_EPOCH_SECONDS * 2)
+
+
+def seed_epochs(scopes, epoch):
+    pipe = counters.redis_client.pipeline(transaction=False)
+    for scope in scopes:
+        key = trending_key(scope, epoch)
+        pipe.zunionstore(key, {key: 1, trending_key(scope, epoch - 1): 2 ** -TRENDING_EPOCH_HALF_LIVES})
+        pipe.expire(key, TRENDING_EPOCH_SECONDS * 2)
+    pipe.execute()
+
+
+def bump_trending(events, now=None):
+    """
+    Adds decayed scores for `events`, an iterable of (post id, category id,
+    event type), to the site-wide and per-category sorted sets in one round
+    trip.
+    """
+    now = now if now is not None else time.time()
+    epoch = trending_epoch(now)
+    multiplier = 2 ** ((now - epoch * TRENDING_EPOCH_SECONDS) / TRENDING_HALF_LIFE)
+
+    scores = {}
+    for post_id, category_id, event_type in events:
+        increment = TRENDING_WEIGHTS[event_type] * multiplier
+        for scope in (SITE_SCOPE, category_scope(category_id)):
+            scores.setdefault(scope, {})
+            scores[scope][str(post_id)] = scores[scope].get(str(post_id), 0) + increment
+    if not scores:
+        return
+
+    pipe = counters.redis_client.pipeline(transaction=False)
+    for scope in scores:
+        queue_seed(pipe, scope, epoch)
+    for scope, post_scores in scores.items():
+        key = trending_key(scope, epoch)
+        for post_id, increment in post_scores.items():
+            pipe.zincrby(key, increment, post_id)
+        pipe.expire(key, TRENDING_EPOCH_SECONDS * 2)
+    seeded = pipe.execute()[:len(scores)]
+
+    unseeded = [scope for scope, first in zip(scores, seeded) if first]
+    if unseeded:
+        seed_epochs(unseeded, epoch)
+
+
+def get_trending_ids(category_id=None, limit=10, now=None):
+    """
+    Returns the ids of the `limit` highest scoring posts with ZREVRANGE.
+    """
+    epoch = trending_epoch(now if now is not None else time.time())
+    scope = category_scope(category_id) if category_id else SITE_SCOPE
+
+    pipe = counters.redis_client.pipeline(transaction=False)
+    queue_seed(pipe, scope, epoch)
+    pipe.zrevrange(trending_key(scope, epoch), 0, limit - 1)
+    seeded, post_ids = pipe.execute()
+
+    if seeded:
+        seed_epochs([scope], epoch)
+        post_ids = counters.redis_client.zrevrange(trending_key(scope, epoch), 0, limit - 1)
+
+    return [post_id.decode('utf-8') for post_id in post_ids]
@@ -2,10 +2,15 @@ from django.urls import path
 
 from .views import (
     PostListView,
+    PostTrendingView,
     PostDetailView,
     PostHeadingView,
+    SearchSuggestView,
     IncrementPostClickView,
+    AnalyticsEventsView,
+    AnalyticsHistoryView,
     CategoryListView,
+    CategoryTreeView,
     CategoryDetailView,
     IncrementCategoryClickView,
     GenerateFakeAnalyticsView,
@@ -17,10 +22,15 @@ urlpatterns = [
     path('generate_posts/', GenerateFakePostsView.as_view(), name='generate-fake-posts'),
     path('generate_analytics/', GenerateFakeAnalyticsView.as_view(), name='generate-fake-analytics'),
     path('posts/', PostListView.as_view(), name='posts-list'),
+    path('posts/trending/', PostTrendingView.as_view(), name='posts-trending'),
     path('post/', PostDetailView.as_view(), name='posts-detail'),
     path('post/headings/', PostHeadingView.as_view(), name='post-headings'),
+    path('search/suggest/', SearchSuggestView.as_view(), name='search-suggest'),
     path('post/increment_click/', IncrementPostClickView.as_view(), name='increment-post-clicks'),
+    path('events/', AnalyticsEventsView.as_view(), name='analytics-events'),
+    path('analytics/', AnalyticsHistoryView.as_view(), name='analytics-history'),
     path('categories/', CategoryListView.as_view(), name='category-list'),
+    path('categories/tree/', CategoryTreeView.as_view(), name='category-tree'),
     path('category/posts/', CategoryDetailView.as_view(), name='category-posts'),
     path('category/increment_click/', IncrementCategoryClickView.as_view(), name='increment-category-clicks'),
 ]
\ No newline at end of file
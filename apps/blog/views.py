@@ -1,31 +1,192 @@
 from rest_framework.generics import ListAPIView, RetrieveAPIView
 from rest_framework.views import APIView
 from rest_framework_api.views import StandardAPIView
-from rest_framework import permissions
+from rest_framework import permissions, status
 from rest_framework.response import Response
-from rest_framework.exceptions import NotFound, APIException
-import redis
+from rest_framework.exceptions import NotFound, APIException, ValidationError
 from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.core.cache import cache
-from django.db.models import Q, F, Prefetch
+from django.db import connection
+from django.db.models import Q, F, OuterRef, Prefetch, Sum
+from django.db.models.functions import TruncDay
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
 
-from .models import Post, Heading, PostAnalytics, Category, CategoryAnalytics
-from .serializers import PostListSerializer, PostSerializer, HeadingSerializer, CategoryListSerializer
-from .tasks import increment_post_impressions
+from .models import Post, PostAnalytics, Category, CategoryAnalytics, exact_unique_views
+from .serializers import PostSerializer, CategoryListSerializer, AnalyticsEventSerializer
+from .pagination import KeysetPagination, PagePagination, paginated_payload
+from .projections import project_post_list, render_post_list
+from .counters import add_counts, counter_pipeline, record_impressions, count_unique_viewers_between
+from .response_cache import envelope, store_entry, entry_response
+from .events import record_events, MAX_EVENTS_PER_BATCH
+from .search import search_posts, full_text_search_enabled
+from .suggest import get_suggestions
+from .trending import bump_trending, get_trending_ids
+from .caching import (
+    CACHE_TIMEOUT,
+    POST_LIST_NAMESPACE,
+    CATEGORIES_NAMESPACE,
+    versioned_key,
+    get_last_modified,
+    post_namespace,
+    category_namespace,
+)
+from .tasks import increment_post_impressions, sync_post_popularity, ROLLUP_MODELS
 from .utils import get_client_ip
-from .tasks import increment_post_views_tasks
 
 from faker import Faker
 import random
 import uuid
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 from django.utils.text import slugify
 
 from core.permissions import HasValidAPIKey
 
-redis_client = redis.StrictRedis(host=settings.REDIS_HOST, port=6379, db=0)
+# Post lists nest category data, so they depend on both namespaces
+POST_LIST_NAMESPACES = [POST_LIST_NAMESPACE, CATEGORIES_NAMESPACE]
+
+POST_SORTING_FIELDS = {
+    'newest': '-created_at',
+    'recently_updated': '-updated_at',
+    'most_viewed': '-popularity',
+}
+
+POST_ORDERING_FIELDS = {
+    'az': 'title',
+    'za': '-title',
+}
+
+
+def parse_range_bound(value):
+    # Accepts a date or a datetime; naive values are taken as UTC
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({'detail': f'Invalid date: {value}'})
+        moment = datetime.combine(day, time.min)
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment, dt_timezone.utc)
+
+
+def wants_headings(request):
+    return request.query_params.get('headings', 'true').lower() not in ('0', 'false', 'no')
+
+
+def post_detail_namespaces(slug):
+    return [post_namespace(slug), CATEGORIES_NAMESPACE]
+
+
+def post_detail_cache_key(slug, include_headings=True):
+    return versioned_key(
+        'post_detail', post_detail_namespaces(slug),
+        slug, 'headings' if include_headings else 'summary',
+    )
+
+
+def record_post_view(post_id, category_id, ip_address, pipe=None):
+    PostAnalytics.record_view(post_id, ip_address, pipe=pipe)
+    bump_trending([(post_id, category_id, 'view')])
+
+
+def get_post_ordering(sorting=None, ordering=None, default='-created_at'):
+    field = POST_ORDERING_FIELDS.get(ordering) or POST_SORTING_FIELDS.get(sorting) or default
+    # `id` breaks ties so every row has a unique position for keyset pagination
+    tie_breaker = '-id' if field.startswith('-') else 'id'
+    return [field, tie_breaker]
+
+
+def wants_cursor_pagination(request):
+    return KeysetPagination.cursor_query_param in request.query_params
+
+
+def get_paginator(request, ordering=None):
+    if wants_cursor_pagination(request):
+        return KeysetPagination(ordering)
+    return PagePagination()
+
+
+def pagination_cache_parts(request):
+    # Requests for the same page share one entry: the page size is the one
+    # the paginator will use, and the page number only matters without a cursor
+    cursor = request.query_params.get(KeysetPagination.cursor_query_param)
+    return [
+        (request.query_params.get(PagePagination.page_query_param) or '1') if cursor is None else None,
+        cursor,
+        PagePagination().get_page_size(request),
+    ]
+
+
+def cache_validators(cache_key, namespaces):
+    # The versioned key changes whenever the cached payload may, so its hash
+    # is the ETag; no payload has to be built to compare it. It is weak
+    # because counters inside a rebuilt payload can differ.
+    return {
+        'etag': f'W/"{hashlib.md5(cache_key.encode()).hexdigest()}"',
+        'last_modified': get_last_modified(*namespaces),
+    }
+
+
+def with_validators(response, validators):
+    response['ETag'] = validators['etag']
+    if validators['last_modified']:
+        response['Last-Modified'] = http_date(validators['last_modified'])
+    return response
+
+
+def serialize_page(serializer_class):
+    return lambda page: serializer_class(page, many=True).data
+
+
+def paginate_and_cache(request, queryset, paginator, render, kind, cache_key, validators):
+    """
+    Paginates `queryset` (model instances or projected rows), renders the
+    page with `render` and caches the response bytes. A client whose
+    validators still match gets a 304, after the page's impressions are
+    recorded.
+    """
+    page = paginator.paginate_queryset(queryset, request)
+
+    ids = [str(row['id'] if isinstance(row, dict) else row.id) for row in page]
+    pipe = counter_pipeline()
+    entry = store_entry(
+        cache_key,
+        paginated_payload(render(page), **paginator.get_page_meta()),
+        CACHE_TIMEOUT,
+        pipe=pipe,
+        ids=ids,
+    )
+
+    record_impressions(kind, ids, pipe=pipe)
+    response = get_conditional_response(request, **validators) or entry_response(request, entry, pipe=pipe)
+    pipe.execute()
+    return with_validators(response, validators)
+
+
+def cached_page_response(request, cache_key, kind, validators):
+    """
+    Answers a list request from the cache without building the page: a 304
+    when the client's validators still match, else the cached page. Either
+    way the page counts as shown again. Without a cached page its ids are
+    unknown, so the page has to be rebuilt even for a 304.
+    """
+    cached_page = cache.get(cache_key)
+    if cached_page is None:
+        return None
+    not_modified = get_conditional_response(request, **validators)
+
+    pipe = counter_pipeline()
+    record_impressions(kind, cached_page['ids'], pipe=pipe)
+    response = not_modified if not_modified is not None else entry_response(request, cached_page, pipe=pipe)
+    pipe.execute()
+    return with_validators(response, validators)
 
 
 class PostListView(StandardAPIView):
@@ -37,32 +198,24 @@ class PostListView(StandardAPIView):
             sorting = request.query_params.get("sorting", None)
             ordering = request.query_params.get("ordering", None)
             categories = request.query_params.getlist("category", [])
-            page = request.query_params.getlist("p", "1")
-
-            cache_key = f'post_list:{search}:{sorting}:{ordering}:{categories}:{page}'
-            cached_posts = cache.get(cache_key)
-            
-            if cached_posts:
-                serialized_posts = PostListSerializer(cached_posts, many=True).data
-
-                for post in cached_posts:
-                    redis_client.incr(f'post:impressions:{post["id"]}')
-                return self.paginate(request, serialized_posts)
-            
-            posts = Post.postobjects.all().select_related("category").prefetch_related(
-                Prefetch("post_analytics", to_attr="analytics_cache")
+            cache_key = versioned_key(
+                'post_list', POST_LIST_NAMESPACES,
+                search, sorting, ordering, sorted(set(categories)), *pagination_cache_parts(request),
             )
+            validators = cache_validators(cache_key, POST_LIST_NAMESPACES)
+            cached_response = cached_page_response(request, cache_key, 'post', validators)
+            if cached_response:
+                return cached_response
+            
+            posts = Post.postobjects.all()
             
             if not posts.exists():
                 raise NotFound(detail='No posts found.')
 
+            ranked = False
             if search != "":
-                posts = Post.postobjects.filter(
-                    Q(title__icontains=search) |
-                    Q(description__icontains=search) |
-                    Q(content__icontains=search) |
-                    Q(keywords__icontains=search)
-                )
+                posts = search_posts(posts, search)
+                ranked = full_text_search_enabled(posts.db)
             
             if categories:
                 category_queries = Q()
@@ -81,55 +234,110 @@ class PostListView(StandardAPIView):
                 
                 posts = posts.filter(category_queries)
 
-            if sorting:
-                if sorting == 'newest':
-                    posts = posts.order_by("-created_at")
-                elif sorting == 'recently_updated':
-                    posts = posts.order_by('-updated_at')
-                elif sorting == 'most_viewed':
-                    posts = posts.annotate(popularity=F("analytics_cache__views")).order_by('-popularity')
-
-            if ordering:
-                if ordering == 'az':
-                    posts = posts.order_by("title")
-                elif ordering == 'za':
-                    posts = posts.order_by('-title')
+            post_ordering = get_post_ordering(sorting, ordering, default='-rank' if ranked else '-created_at')
+            posts = project_post_list(posts.order_by(*post_ordering), post_ordering)
 
-            cache.set(cache_key, posts, timeout=60*5)
-
-            serialized_posts = PostListSerializer(posts, many=True).data
-
-            for post in posts:
-                redis_client.incr(f'post:impressions:{post.id}')
-    
-            return self.paginate(request, serialized_posts)
+            return paginate_and_cache(
+                request, posts, get_paginator(request, post_ordering),
+                render_post_list, 'post', cache_key, validators,
+            )
 
         except Post.DoesNotExist:
             raise NotFound(detail='No posts found.')
+        except NotFound:
+            raise
         except Exception as e:
             raise APIException(detail=f'An unexpected error ocurreed: {str(e)}')
             
 
+class PostTrendingView(StandardAPIView):
+    permission_classes = [HasValidAPIKey]
+
+    def get(self, request):
+        category = request.query_params.get('category')
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return self.error("Invalid limit parameter")
+
+        category_id = None
+        if category:
+            try:
+                category_id = uuid.UUID(category)
+            except ValueError:
+                category_id = Category.objects.filter(slug=category).values_list('id', flat=True).first()
+                if category_id is None:
+                    raise NotFound(detail='The requested category does not exist.')
+
+        post_ids = get_trending_ids(category_id, limit)
+
+        # Each post is cached on its own so any top-K order is served from
+        # the same entries; missing ones are loaded with a single query
+        prefix = versioned_key('post_item', POST_LIST_NAMESPACES)
+        keys = {post_id: f'{prefix}:{post_id}' for post_id in post_ids}
+        cached_posts = cache.get_many(keys.values())
+
+        missing = [post_id for post_id in post_ids if keys[post_id] not in cached_posts]
+        if missing:
+            posts = project_post_list(Post.postobjects.filter(id__in=missing))
+            loaded = {keys[post['id']]: post for post in render_post_list(posts)}
+            cache.set_many(loaded, timeout=CACHE_TIMEOUT)
+            cached_posts.update(loaded)
+
+        results = [cached_posts[keys[post_id]] for post_id in post_ids if keys[post_id] in cached_posts]
+        record_impressions('post', [post['id'] for post in results])
+        return self.response(results)
+
+
 class PostDetailView(StandardAPIView):
     permission_classes = [HasValidAPIKey]
 
     def get(self, request):
         ip_address = get_client_ip(request)
         slug = request.query_params.get('slug')
+        include_headings = wants_headings(request)
         
         try:
-            cached_post = cache.get(f'post_detail:{slug}')
+            cache_key = post_detail_cache_key(slug, include_headings)
+            validators = cache_validators(cache_key, post_detail_namespaces(slug))
+            not_modified = get_conditional_response(request, **validators)
+            cached_post = cache.get(cache_key)
             if cached_post:
-                increment_post_views_tasks.delay(cached_post['slug'], ip_address)
-                return self.response(cached_post)
-
-
-            post = Post.postobjects.get(slug=slug)
-            serialized_post = PostSerializer(post).data
-            
-            cache.set(f'post_detail:{slug}', serialized_post, timeout=60*5)
+                pipe = counter_pipeline()
+                record_post_view(cached_post['id'], cached_post['category_id'], ip_address, pipe=pipe)
+                response = not_modified or entry_response(request, cached_post, pipe=pipe)
+                pipe.execute()
+                return with_validators(response, validators)
+            if not_modified:
+                # The client still has the page but the cached bytes were
+                # evicted; the view counts all the same
+                viewed = Post.postobjects.filter(slug=slug).values('id', 'category_id').first()
+                if viewed is None:
+                    raise Post.DoesNotExist
+                record_post_view(viewed['id'], viewed['category_id'], ip_address)
+                return with_validators(not_modified, validators)
+
+            # One joined query; headings and the rendered content are
+            # precomputed columns, so the raw content is never loaded
+            posts = Post.postobjects.select_related('category', 'post_analytics').defer('content', 'search_vector')
+            if connection.vendor == 'postgresql':
+                # Breadcrumbs of nested categories come back with the post
+                posts = posts.annotate(category_breadcrumbs=Category.breadcrumbs(OuterRef('category__path')))
+            post = posts.get(slug=slug)
+            serialized_post = PostSerializer(post, include_headings=include_headings).data
+            pipe = counter_pipeline()
+            entry = store_entry(
+                cache_key, envelope(serialized_post), CACHE_TIMEOUT,
+                pipe=pipe,
+                id=str(post.id),
+                category_id=str(post.category_id),
+                headings=serialized_post.get('headings'),
+            )
 
-            increment_post_views_tasks.delay(post.slug, ip_address)
+            record_post_view(post.id, post.category_id, ip_address, pipe=pipe)
+            response = entry_response(request, entry, pipe=pipe)
+            pipe.execute()
 
 
         except Post.DoesNotExist:
@@ -137,7 +345,7 @@ class PostDetailView(StandardAPIView):
         except Exception as e:
             raise APIException(detail=f'An unexpected error ocurreed: {str(e)}')
 
-        return self.response(serialized_post)
+        return with_validators(response, validators)
     
 
 class PostHeadingView(StandardAPIView):
@@ -145,9 +353,28 @@ class PostHeadingView(StandardAPIView):
 
     def get(self, request):
         post_slug = request.query_params.get('slug')
-        heading_objects = Heading.objects.filter(post__slug=post_slug)
-        serializer_data = HeadingSerializer(heading_objects, many=True).data
-        return self.response(serializer_data)
+
+        # Headings are part of the cached post detail, which is usually warm
+        cached_post = cache.get(post_detail_cache_key(post_slug))
+        if cached_post:
+            return self.response(cached_post['headings'])
+
+        toc = Post.objects.filter(slug=post_slug).values_list('toc', flat=True).first()
+        return self.response(toc or [])
+    
+
+class SearchSuggestView(StandardAPIView):
+    permission_classes = [HasValidAPIKey]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 20)
+        except ValueError:
+            return self.error("Invalid limit parameter")
+
+        return self.response(get_suggestions(query, limit))
     
 
 class IncrementPostClickView(StandardAPIView):
@@ -156,20 +383,127 @@ class IncrementPostClickView(StandardAPIView):
     def post(self, request):
         data = request.data
 
-        try:
-            post = Post.postobjects.get(slug=data['slug'])
-        except Post.DoesNotExist:
+        post = Post.postobjects.filter(slug=data['slug']).values('id', 'category_id', 'post_analytics__clicks').first()
+        if post is None:
             raise NotFound(detail='The requested post does not exist.')
         
         try:
-            post_analytics, created = PostAnalytics.objects.get_or_create(post=post)
-            post_analytics.increment_click()
+            # Buffered like every other click, so the flush also writes the
+            # hourly rollups behind the analytics history
+            add_counts('clicks', 'post', {post['id']: 1})
+            bump_trending([(post['id'], post['category_id'], 'click')])
         except Exception as e:
             raise APIException(detail=f'An unexpected error ocurreed: {str(e)}')
         
         return self.response({
             'message': 'Click incremented successfully',
-            'clicks': post_analytics.clicks
+            # The flushed total plus this click; other buffered clicks land on the next flush
+            'clicks': (post['post_analytics__clicks'] or 0) + 1
+        })
+
+
+class AnalyticsEventsView(StandardAPIView):
+    permission_classes = [HasValidAPIKey]
+
+    def post(self, request):
+        events = request.data
+        if not isinstance(events, list):
+            return self.error('Expected a list of events.')
+        if len(events) > MAX_EVENTS_PER_BATCH:
+            return self.error(f'A batch holds at most {MAX_EVENTS_PER_BATCH} events.')
+
+        valid, rejected = [], []
+        for index, event in enumerate(events):
+            serializer = AnalyticsEventSerializer(data=event)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                rejected.append({'index': index, 'errors': serializer.errors})
+
+        try:
+            unresolved = record_events([event for _, event in valid], get_client_ip(request))
+        except Exception as e:
+            raise APIException(detail=f'An unexpected error occurred: {str(e)}')
+
+        rejected.extend({'index': valid[position][0], 'errors': 'Target does not exist.'} for position in unresolved)
+
+        return self.response({
+            'accepted': len(valid) - len(unresolved),
+            'rejected': sorted(rejected, key=lambda item: item['index']),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class AnalyticsHistoryView(StandardAPIView):
+    permission_classes = [HasValidAPIKey]
+
+    def get(self, request):
+        kind = next((kind for kind in ROLLUP_MODELS if kind in request.query_params), None)
+        if kind is None:
+            return self.error('A post or category parameter is required.')
+
+        granularity = request.query_params.get('granularity', 'hour')
+        if granularity not in ('hour', 'day'):
+            return self.error('Invalid granularity parameter')
+
+        end = parse_range_bound(request.query_params.get('to')) or timezone.now()
+        start = parse_range_bound(request.query_params.get('from')) or end - timedelta(days=1)
+        if start >= end:
+            return self.error('Invalid date range')
+        # Ranges start on a bucket boundary, or the first day's compacted
+        # row (which starts at midnight) would be left out
+        start = start.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+        if granularity == 'day':
+            start = start.replace(hour=0)
+
+        reference = request.query_params[kind]
+        lookup = Q(slug=reference)
+        try:
+            lookup |= Q(id=uuid.UUID(reference))
+        except ValueError:
+            pass
+
+        rollup_model = ROLLUP_MODELS[kind]
+        target = rollup_model._meta.get_field(rollup_model.target_field).related_model.objects.filter(lookup).first()
+        if target is None:
+            raise NotFound(detail=f'The requested {kind} does not exist.')
+
+        # Touches one row per bucket in range: hourly rows, plus daily rows
+        # once the hours have been compacted
+        buckets = rollup_model.objects.filter(
+            **{rollup_model.target_field: target}, start__gte=start, start__lt=end
+        )
+        if granularity == 'hour':
+            buckets = buckets.filter(granularity='hour').annotate(bucket=F('start'))
+        else:
+            buckets = buckets.annotate(bucket=TruncDay('start'))
+
+        history = buckets.values('bucket').annotate(
+            total_views=Sum('views'),
+            total_impressions=Sum('impressions'),
+            total_clicks=Sum('clicks'),
+        ).order_by('bucket')
+
+        # Distinct viewers come from the daily HyperLogLogs, which exact mode
+        # does not keep (its view rows only remember a visitor's first view)
+        unique_viewers = None
+        if not exact_unique_views():
+            unique_viewers = count_unique_viewers_between(kind, target.id, start, end)
+
+        return self.response({
+            kind: str(target.id),
+            'granularity': granularity,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'unique_viewers': unique_viewers,
+            'buckets': [
+                {
+                    'start': row['bucket'].isoformat(),
+                    'views': row['total_views'],
+                    'impressions': row['total_impressions'],
+                    'clicks': row['total_clicks'],
+                }
+                for row in history
+            ],
         })
 
 
@@ -180,17 +514,14 @@ class CategoryListView(StandardAPIView):
             search = request.query_params.get("search", "").strip()
             ordering = request.query_params.get("ordering", None)
             sorting = request.query_params.get("sorting", None)
-            page = request.query_params.get("p", "1")
-
-            cache_key = f'category_list:{page}:{ordering}:{sorting}:{search}:{parent_slug}'
-            cached_categories = cache.get(cache_key)
-            
-            if cached_categories:
-                serialized_categories = CategoryListSerializer(categories, many=True).data
-
-                for category in cached_categories:
-                    redis_client.incr(f'category:impressions:{category["id"]}')
-                return self.paginate(request, serialized_categories)
+            cache_key = versioned_key(
+                'category_list', [CATEGORIES_NAMESPACE],
+                ordering, sorting, search, parent_slug, *pagination_cache_parts(request),
+            )
+            validators = cache_validators(cache_key, [CATEGORIES_NAMESPACE])
+            cached_response = cached_page_response(request, cache_key, 'category', validators)
+            if cached_response:
+                return cached_response
 
             if parent_slug:
                 categories = Category.objects.filter(parent__slug=parent_slug).prefetch_related(
@@ -218,7 +549,8 @@ class CategoryListView(StandardAPIView):
                 elif sorting == 'recently_updated':
                     categories = categories.order_by('-updated_at')
                 elif sorting == 'most_viewed':
-                    categories = categories.annotate(popularity=F("analytics_cache__views")).order_by('-popularity')
+                    # `analytics_cache` is a prefetch attribute, not a relation a query can join
+                    categories = categories.annotate(popularity=F('category_analytics__views')).order_by('-popularity', 'id')
 
             if ordering:
                 if ordering == 'az':
@@ -226,17 +558,18 @@ class CategoryListView(StandardAPIView):
                 elif ordering == 'za':
                     categories = categories.order_by('-name')
 
-            cache.set(cache_key, categories, timeout=60*5)
-
-            serialized_categories = CategoryListSerializer(categories, many=True).data
+            if not categories.ordered:
+                categories = categories.order_by('name', 'id')
 
-            for category in categories:
-                redis_client.incr(f'category:impressions:{category.id}')
-            
-            return self.paginate(request, serialized_categories)
+            return paginate_and_cache(
+                request, categories, PagePagination(),
+                serialize_page(CategoryListSerializer), 'category', cache_key, validators,
+            )
         
         except Category.DoesNotExist:
             raise NotFound(detail='No categories found.')
+        except NotFound:
+            raise
         except Exception as e:
             raise APIException(detail=f'An unexpected error ocurreed: {str(e)}')
 
@@ -247,61 +580,108 @@ class CategoryDetailView(StandardAPIView):
     def get(self, request):
         try:
             slug = request.query_params.get('slug', None)
-            page = request.query_params.get('p', '1')
 
             if not slug:
                 return self.error("Missing slug parameter")
-            
-            cache_key = f"category_posts:{slug}:{page}"
-            cached_data = cache.get(cache_key)
-            
-            if cached_data:
-                return self.paginate(request, cached_data)
+
+            include_subcategories = request.query_params.get('subcategories', '').lower() in ('1', 'true', 'yes')
+
+            namespaces = [category_namespace(slug), CATEGORIES_NAMESPACE]
+            cache_key = versioned_key(
+                'category_posts', namespaces,
+                slug, include_subcategories, *pagination_cache_parts(request),
+            )
+            validators = cache_validators(cache_key, namespaces)
+            cached_response = cached_page_response(request, cache_key, 'post', validators)
+            if cached_response:
+                return cached_response
             
             category = get_object_or_404(Category, slug=slug)
 
-            posts = Post.postobjects.filter(category=category).select_related('category').prefetch_related(
-                Prefetch("post_analytics", to_attr="analytics_cache")
-            )
+            if include_subcategories:
+                posts = Post.postobjects.filter(category__path__startswith=category.path)
+            else:
+                posts = Post.postobjects.filter(category=category)
 
             if not posts.exists():
                 raise NotFound(detail=f"No posts found for category '{category.name}'.")
-            
-            serialized_posts = PostListSerializer(posts, many=True).data
-            
-            cache.set(cache_key, serialized_posts, timeout=60*5)
 
-            for post in posts:
-                redis_client.incr(f'post:impressions:{post.id}')
+            post_ordering = get_post_ordering()
+            posts = project_post_list(posts.order_by(*post_ordering), post_ordering)
 
-            return self.paginate(request, serialized_posts)
+            return paginate_and_cache(
+                request, posts, get_paginator(request, post_ordering),
+                render_post_list, 'post', cache_key, validators,
+            )
         
         except Category.DoesNotExist:
             raise NotFound(detail='No categories found.')
+        except NotFound:
+            raise
         except Exception as e:
             raise APIException(detail=f'An unexpected error occurred: {str(e)}')
         
 
+def build_category_tree(categories):
+    """
+    Nests categories ordered by path (so parents come before children) into
+    a list of root nodes with sorted `children`.
+    """
+    nodes = {}
+    roots = []
+    for category in categories:
+        node = {'id': str(category['id']), 'name': category['name'], 'slug': category['slug'], 'children': []}
+        nodes[category['id']] = node
+        parent = nodes.get(category['parent_id'])
+        (parent['children'] if parent else roots).append(node)
+
+    def sort(siblings):
+        siblings.sort(key=lambda node: node['name'])
+        for node in siblings:
+            sort(node['children'])
+    sort(roots)
+    return roots
+
+
+class CategoryTreeView(StandardAPIView):
+    permission_classes = [HasValidAPIKey]
+
+    def get(self, request):
+        cache_key = versioned_key('category_tree', [CATEGORIES_NAMESPACE])
+        validators = cache_validators(cache_key, [CATEGORIES_NAMESPACE])
+
+        not_modified = get_conditional_response(request, **validators)
+        if not_modified:
+            return with_validators(not_modified, validators)
+
+        pipe = counter_pipeline()
+        entry = cache.get(cache_key)
+        if entry is None:
+            categories = Category.objects.order_by('path').values('id', 'parent_id', 'name', 'slug')
+            entry = store_entry(cache_key, envelope(build_category_tree(categories)), CACHE_TIMEOUT, pipe=pipe)
+        response = entry_response(request, entry, pipe=pipe)
+        pipe.execute()
+        return with_validators(response, validators)
+
+
 class IncrementCategoryClickView(StandardAPIView):
     permission_classes = [HasValidAPIKey]
 
-    def category(self, request):
+    def post(self, request):
         data = request.data
 
-        try:
-            category = Category.objects.get(slug=data['slug'])
-        except Category.DoesNotExist:
+        category = Category.objects.filter(slug=data['slug']).values('id', 'category_analytics__clicks').first()
+        if category is None:
             raise NotFound(detail='The requested category does not exist.')
         
         try:
-            category_analytics, created = CategoryAnalytics.objects.get_or_create(category=category)
-            category_analytics.increment_click()
+            add_counts('clicks', 'category', {category['id']: 1})
         except Exception as e:
             raise APIException(detail=f'An unexpected error ocurreed: {str(e)}')
         
         return self.response({
             'message': 'Click incremented successfully',
-            'clicks': category_analytics.clicks
+            'clicks': (category['category_analytics__clicks'] or 0) + 1
         })
 
 
@@ -358,8 +738,9 @@ class GenerateFakeAnalyticsView(StandardAPIView):
             analytics.impressions = impressions
             analytics.clicks = clicks
             analytics.avg_time_on_page = avg_time_on_page
-            analytics._update_click_through_rate()
             analytics.save()
 
+        sync_post_popularity([post.id for post in posts])
+
         return self.response(f"{analytics_to_generate} analytics generated successfully.")
     
\ No newline at end of file
@@ -41,6 +41,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # 'storages'
 ]
 
@@ -151,6 +152,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored under their content hash, deduplicated and immutable
+STORAGES = {
+    "default": {
+        "BACKEND": "core.storage_backends.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -174,6 +185,9 @@ CHANNELS_LAYERS = {
 
 REDIS_HOST = env('REDIS_HOST')
 
+BLOG_EXACT_UNIQUE_VIEWS = env.bool('BLOG_EXACT_UNIQUE_VIEWS', default=False)
+BLOG_HOURLY_ROLLUP_RETENTION_DAYS = env.int('BLOG_HOURLY_ROLLUP_RETENTION_DAYS', default=30)
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -208,7 +222,25 @@ CELERY_IMPORTS = (
 )
 
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
-CELERY_BEAT_SCHEDULE = {}
+CELERY_BEAT_SCHEDULE = {
+    # Re-schedules itself sooner while the counter backlog is large
+    'flush-analytics-counters': {
+        'task': 'apps.blog.tasks.flush_analytics_counters',
+        'schedule': 60.0,
+    },
+    'sync-unique-views': {
+        'task': 'apps.blog.tasks.sync_unique_views',
+        'schedule': 300.0,
+    },
+    'compact-analytics-rollups': {
+        'task': 'apps.blog.tasks.compact_analytics_rollups',
+        'schedule': 3600.0,
+    },
+    'sweep-orphaned-thumbnails': {
+        'task': 'apps.blog.tasks.sweep_orphaned_thumbnails',
+        'schedule': 86400.0,
+    },
+}
 
 
 # AWS_ACCESS_KEY_ID = env('AWS_ACCESS_KEY_ID')
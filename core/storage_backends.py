@@ -1,6 +1,61 @@
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+
 # from django.conf import settings
 # from storages.backends.s3boto3 import S3Boto3Storage
 
+CONTENT_ADDRESSED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{64}(\.\w+)?$')
+
+
+def content_addressed_name(name, content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    extension = posixpath.splitext(name)[1].lower()
+    return posixpath.join(posixpath.dirname(name), f'{digest.hexdigest()}{extension}')
+
+
+def is_content_addressed(name):
+    return CONTENT_ADDRESSED_NAME_RE.search(name) is not None
+
+
+class ContentAddressedMixin:
+    """
+    Names every saved file after the SHA-256 of its bytes, keeping the
+    directory and extension it was uploaded with. Identical uploads share
+    one file that is only written once, and a name never changes content,
+    so its URL can be cached forever.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # A taken name already holds the same bytes, so it is reused as is
+        return name
+
+    def _save(self, name, content):
+        name = content_addressed_name(name, content)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def delete(self, name):
+        # Other records may point at the same content; orphaned files are
+        # removed with purge() once nothing references them
+        pass
+
+    def purge(self, name):
+        super().delete(name)
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Two uploads of the same bytes may race to write one name
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
 
 # class StaticStorage(S3Boto3Storage):
 #     location = 'static'
@@ -11,4 +66,4 @@
 #     location = 'media'
 #     default_acl = 'public-read'
 #     file_overwrite = False
-#     # custom_domain = settings.AWS_S3_CUSTOM_DOMAIN
\ No newline at end of file
+#     # custom_domain = settings.AWS_S3_CUSTOM_DOMAIN
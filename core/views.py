@@ -0,0 +1,13 @@
+from django.views.static import serve
+
+from .storage_backends import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    # Content-addressed files never change, so clients need not revalidate
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response